@@ -1,8 +1,19 @@
+import logging
+import os
 from pathlib import Path
 import pandas as pd
-from sqlalchemy import (create_engine, Column, Integer, String, Text, Numeric,
-                        ForeignKey, Date)
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy import (create_engine, event, Column, Integer, String, Text,
+                        Numeric, ForeignKey, Index, UniqueConstraint)
+from sqlalchemy.orm import Session, declarative_base, relationship
+
+import memory_profile
+from memory_profile import memory_stage
+import sales_layout
+from sales_archive import exclusive_app_lock, install_archive_views
+from sales_layout import LAYOUTS, SaleDate, assign_ids_on_flush
+from import_validation import (reject_listed, reject_unknown, rejected_names,
+                               validate_partner_products, validate_partners,
+                               write_reject_report)
 
 # ORM модели 
 Base = declarative_base()
@@ -47,6 +58,7 @@ class Product(Base):
 
     product_type = relationship("ProductType", back_populates="products")
     partner_products = relationship("PartnerProduct", back_populates="product")
+    materials = relationship("ProductMaterial", back_populates="product")
 
 class MaterialType(Base):
     __tablename__ = "material_types"
@@ -54,20 +66,77 @@ class MaterialType(Base):
     name = Column(String(100), unique=True, nullable=False)
     defect_percentage = Column(Numeric(10, 4))
 
+    products = relationship("ProductMaterial", back_populates="material_type")
+
+class ProductMaterial(Base):
+    """Спецификация (BOM): какой материал и в каком расходе идет на продукцию"""
+    __tablename__ = "product_materials"
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    material_type_id = Column(Integer, ForeignKey("material_types.id"), nullable=False)
+    # Расход на единицу продукции — param1 * param2 * коэффициент типа
+    # продукции; коэффициент не хранится здесь и берется при расчете
+    param1 = Column(Numeric(12, 4), nullable=False)
+    param2 = Column(Numeric(12, 4), nullable=False)
+
+    __table_args__ = (UniqueConstraint("product_id", "material_type_id"),)
+
+    product = relationship("Product", back_populates="materials")
+    material_type = relationship("MaterialType", back_populates="products")
+
 class PartnerProduct(Base):
     __tablename__ = "partner_products"
     id = Column(Integer, primary_key=True)
     partner_id = Column(Integer, ForeignKey("partners.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer)
-    sale_date = Column(Date)
+    # В компактной схеме (sales_layout) — номер дня вместо текста ISO
+    sale_date = Column(SaleDate)
+
+    # История и суммы по партнеру читаются диапазоном этого индекса;
+    # quantity в индексе позволяет суммировать объемы без чтения таблицы.
+    # В компактной схеме индекса нет: таблица сама упорядочена по партнеру
+    __table_args__ = (
+        Index("ix_partner_products_partner_date_qty", "partner_id", "sale_date", "quantity"),
+    )
 
     partner = relationship("Partner", back_populates="products")
     product = relationship("Product", back_populates="partner_products")
 
+
+# Отслеживание изменений 
+def watch_model_changes(models, callback, key):
+    """
+    Вызов callback() после фиксации транзакции, изменившей объекты models.
+
+    Вызов после commit, а не при flush, не дает параллельным читателям
+    закэшировать еще не зафиксированное состояние.
+
+    Аргументы:
+        models: Кортеж отслеживаемых ORM классов
+        callback: Функция без аргументов
+        key: Уникальный ключ отметки в session.info
+    """
+    @event.listens_for(Session, "after_flush")
+    def _track(session, _flush_context):
+        if any(isinstance(obj, models) for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.info[key] = True
+
+    @event.listens_for(Session, "after_commit")
+    def _on_commit(session):
+        if session.info.pop(key, False):
+            callback()
+
+    @event.listens_for(Session, "after_rollback")
+    def _on_rollback(session):
+        session.info.pop(key, None)
+
 # Конфигурация 
 DATA_DIR = Path(__file__).resolve().parent
-DB_PATH = DATA_DIR / "app.db"
+# APP_DB_PATH позволяет открыть другую базу (например, сгенерированную для замеров)
+DB_PATH = Path(os.environ.get("APP_DB_PATH", DATA_DIR / "app.db"))
+# Схема хранения продаж определяется по файлу базы до первого запроса
+sales_layout.set_layout(sales_layout.database_layout(DB_PATH))
 EXCEL_FILES = {
     "product_types": DATA_DIR / "import_data/Product_type_import.xlsx",
     "products": DATA_DIR / "import_data/Products_import.xlsx",
@@ -75,114 +144,193 @@ EXCEL_FILES = {
     "partners": DATA_DIR / "import_data/Partners_import.xlsx",
     "partner_products": DATA_DIR / "import_data/Partner_products_import.xlsx",
 }
+REJECTS_PATH = DATA_DIR / "import_rejects.xlsx"
+ARCHIVE_DIR = DB_PATH.parent / "archive"
+
+# Номера новых продаж продолжают и архивы прошлых лет (см. sales_archive)
+assign_ids_on_flush(PartnerProduct, ARCHIVE_DIR)
+
 
 # Загрузка данных 
 def load_data(session):
+    """Загрузка данных из Excel; возвращает отклоненные строки по таблицам"""
+    rejects = {}
+
     # 1. Product types
-    df_ptypes = pd.read_excel(EXCEL_FILES["product_types"])
-    for _, row in df_ptypes.iterrows():
-        session.add(
-            ProductType(
-                name=row["Тип продукции"],
-                coefficient=row["Коэффициент типа продукции"],
+    with memory_stage("импорт: типы продукции"):
+        df_ptypes = pd.read_excel(EXCEL_FILES["product_types"])
+        for _, row in df_ptypes.iterrows():
+            session.add(
+                ProductType(
+                    name=row["Тип продукции"],
+                    coefficient=row["Коэффициент типа продукции"],
+                )
             )
-        )
-    session.commit()
+        session.flush()
 
     # 2. Products
-    df_products = pd.read_excel(EXCEL_FILES["products"])
-    for _, row in df_products.iterrows():
-        ptype = (
-            session.query(ProductType)
-            .filter_by(name=row["Тип продукции"])
-            .one()
-        )
-        session.add(
-            Product(
-                product_type=ptype,
-                article=int(row["Артикул"]),
-                name=row["Наименование продукции"],
-                min_partner_price=row["Минимальная стоимость для партнера"],
+    with memory_stage("импорт: продукция"):
+        df_products = pd.read_excel(EXCEL_FILES["products"])
+        for _, row in df_products.iterrows():
+            ptype = (
+                session.query(ProductType)
+                .filter_by(name=row["Тип продукции"])
+                .one()
             )
-        )
-    session.commit()
+            session.add(
+                Product(
+                    product_type=ptype,
+                    article=int(row["Артикул"]),
+                    name=row["Наименование продукции"],
+                    min_partner_price=row["Минимальная стоимость для партнера"],
+                )
+            )
+        session.flush()
 
     # 3. Material types
-    df_mtypes = pd.read_excel(EXCEL_FILES["material_types"])
-    for _, row in df_mtypes.iterrows():
-        session.add(
-            MaterialType(
-                name=row["Тип материала"],
-                defect_percentage=row["Процент брака материала "],
+    with memory_stage("импорт: типы материалов"):
+        df_mtypes = pd.read_excel(EXCEL_FILES["material_types"])
+        for _, row in df_mtypes.iterrows():
+            session.add(
+                MaterialType(
+                    name=row["Тип материала"],
+                    defect_percentage=row["Процент брака материала "],
+                )
             )
-        )
-    session.commit()
+        session.flush()
 
     # 4. Partner types (выделяем уникальные значения из таблицы партнёров)
-    df_partners = pd.read_excel(EXCEL_FILES["partners"])
-    for ptype_name in df_partners["Тип партнера"].unique():
-        if not session.query(PartnerType).filter_by(name=ptype_name).first():
-            session.add(PartnerType(name=ptype_name))
-    session.commit()
+    with memory_stage("импорт: типы партнеров"):
+        df_partners, rejects["partners"] = validate_partners(
+            pd.read_excel(EXCEL_FILES["partners"])
+        )
+        for ptype_name in df_partners["Тип партнера"].unique():
+            if not session.query(PartnerType).filter_by(name=ptype_name).first():
+                session.add(PartnerType(name=ptype_name))
+        session.flush()
 
     # 5. Partners
-    for _, row in df_partners.iterrows():
-        ptype = (
-            session.query(PartnerType)
-            .filter_by(name=row["Тип партнера"])
-            .one()
-        )
-        session.add(
-            Partner(
-                partner_type=ptype,
-                name=row["Наименование партнера"],
-                legal_address=row["Юридический адрес партнера"],
-                inn=str(int(row["ИНН"])).zfill(10) if pd.notna(row["ИНН"]) else None,
-                director=row["Директор"],
-                phone=row["Телефон партнера"],
-                email=row["Электронная почта партнера"],
-                rating=int(row["Рейтинг"]) if pd.notna(row["Рейтинг"]) else None,
+    with memory_stage("импорт: партнеры"):
+        for _, row in df_partners.iterrows():
+            ptype = (
+                session.query(PartnerType)
+                .filter_by(name=row["Тип партнера"])
+                .one()
             )
-        )
-    session.commit()
+            session.add(
+                Partner(
+                    partner_type=ptype,
+                    name=row["Наименование партнера"],
+                    legal_address=row["Юридический адрес партнера"],
+                    inn=row["ИНН"] if pd.notna(row["ИНН"]) else None,
+                    director=row["Директор"],
+                    phone=row["Телефон партнера"],
+                    email=row["Электронная почта партнера"],
+                    rating=int(row["Рейтинг"]) if pd.notna(row["Рейтинг"]) else None,
+                )
+            )
+        session.flush()
 
     # 6. Partner products
-    df_pp = pd.read_excel(EXCEL_FILES["partner_products"])
-    for _, row in df_pp.iterrows():
-        partner = (
-            session.query(Partner)
-            .filter_by(name=row["Наименование партнера"])
-            .first()
+    with memory_stage("импорт: продажи"):
+        df_pp, bad_pp = validate_partner_products(
+            pd.read_excel(EXCEL_FILES["partner_products"])
         )
-        product = session.query(Product).filter_by(
-            name=row["Продукция"]
-        ).first()
-        if partner is None or product is None:
-            print(
-                f"!!! Пропуск строки: не найден партнёр или продукт: {row.to_dict()}"
+        df_pp, bad_rejected = reject_listed(
+            df_pp, "Наименование партнера",
+            rejected_names(rejects["partners"], df_partners, "Наименование партнера"),
+            "партнер отклонен при проверке (см. лист partners)",
+        )
+        df_pp, bad_partner = reject_unknown(
+            df_pp, "Наименование партнера",
+            [name for (name,) in session.query(Partner.name)],
+            "партнер не найден",
+        )
+        df_pp, bad_product = reject_unknown(
+            df_pp, "Продукция",
+            [name for (name,) in session.query(Product.name)],
+            "продукция не найдена",
+        )
+        rejects["partner_products"] = pd.concat([bad_pp, bad_rejected, bad_partner, bad_product])
+        for _, row in df_pp.iterrows():
+            partner = (
+                session.query(Partner)
+                .filter_by(name=row["Наименование партнера"])
+                .first()
             )
-            continue
-        session.add(
-            PartnerProduct(
-                partner=partner,
-                product=product,
-                quantity=int(row["Количество продукции"]),
-                sale_date=pd.to_datetime(row["Дата продажи"]).date()
-                if pd.notna(row["Дата продажи"])
-                else None,
+            product = session.query(Product).filter_by(
+                name=row["Продукция"]
+            ).first()
+            session.add(
+                PartnerProduct(
+                    partner=partner,
+                    product=product,
+                    quantity=int(row["Количество продукции"]),
+                    sale_date=row["Дата продажи"].date()
+                    if pd.notna(row["Дата продажи"])
+                    else None,
+                )
             )
-        )
-    session.commit()
+        session.flush()
+    return rejects
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Создание app.db и импорт данных из Excel")
+    parser.add_argument(
+        "--bulk", action="store_true",
+        help="быстрая первичная загрузка: индексы и проверка внешних ключей "
+             "строятся один раз в конце (приложение не должно быть запущено)",
+    )
+    parser.add_argument(
+        "--layout", choices=LAYOUTS, default=None,
+        help="схема хранения продаж после импорта (clustered — компактная, "
+             "см. sales_layout); по умолчанию схема не меняется",
+    )
+    args = parser.parse_args(argv)
+    if memory_profile.ENABLED:
+        # Отчеты memory_stage по этапам импорта
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-def main():
     engine = create_engine(f"sqlite:///{DB_PATH}", echo=False, future=True)
-    Session = sessionmaker(bind=engine)
     Base.metadata.create_all(engine)
-    with Session() as session:
-        load_data(session)
+    if args.bulk:
+        from bulk_load import load_data_bulk
+
+        rejects, timings = load_data_bulk(engine, DB_PATH)
+        engine.dispose()
+        for phase, seconds in timings.items():
+            print(f"{phase:<28} {seconds:8.2f} с")
+    else:
+        engine.dispose()
+        from db_writer import DBWriter
+
+        # Импорт идёт через поток-писатель одной транзакцией
+        writer = DBWriter(f"sqlite:///{DB_PATH}")
+        try:
+            rejects = writer.submit(load_data).result()
+        finally:
+            writer.close()
+    if args.layout:
+        try:
+            with exclusive_app_lock(DB_PATH):
+                migrated = sales_layout.migrate(DB_PATH, args.layout, ARCHIVE_DIR)
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+        if migrated:
+            print(f"Продажи переведены в схему {args.layout}")
+    rejected = write_reject_report(rejects, REJECTS_PATH)
+    if rejected:
+        print(f"Отклонено строк: {rejected}, причины в {REJECTS_PATH}")
     print(f"Готово! База данных создана в {DB_PATH}")
 
 if __name__ == "__main__":
     main()
 
-ENGINE = create_engine(f"sqlite:///{DB_PATH}", echo=False, future=True)
\ No newline at end of file
+# Движок чтения: partner_products на его соединениях — объединение текущей
+# таблицы и архивов прошлых лет (см. sales_archive)
+ENGINE = create_engine(
+    f"sqlite:///{DB_PATH}", echo=False, future=True, connect_args={"uri": True}
+)
+install_archive_views(ENGINE, ARCHIVE_DIR)
\ No newline at end of file
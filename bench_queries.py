@@ -0,0 +1,157 @@
+"""
+bench_queries.py — микробенчмарк частых запросов
+-----------------------------------------------
+
+Для каждого частого запроса замеряется время одного вызова прежнего
+варианта (session.query(...)) и текущего (готовый select()), каждый —
+с компиляцией при каждом вызове (compiled_cache=None) и со скомпилированным
+SQL из кэша движка. В SQLAlchemy 2.0 кэш компиляции работает и для
+session.query, поэтому:
+
+* прежний / текущий с кэшем — выигрыш от изменения самого запроса
+* без кэша / с кэшем у текущего — доля компиляции SQL во времени вызова
+
+Запросы:
+
+* история продаж партнера (PartnerProductHistoryPage.load_partner_history)
+* коэффициенты для расчета материала (calculate_material_quantity)
+* суммы продаж и места партнеров, первые 50 по объему (rank_partners)
+
+Запуск: python bench_queries.py [--calls 2000]
+База берется из APP_DB_PATH или app.db.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import warnings
+
+from sqlalchemy import func
+from sqlalchemy.exc import LegacyAPIWarning
+from sqlalchemy.orm import Session, contains_eager
+
+from DB_prepare import ENGINE, MaterialType, Partner, PartnerProduct, Product, ProductType
+from material_calculator import COEFFICIENTS_STMT
+from partner_product_history import HISTORY_STMT
+from partner_ranking import NO_LIMIT, RANK_STMTS, SORT_TOTAL_QTY, discount_expr
+
+NO_CACHE = {"compiled_cache": None}
+
+
+# Прежние варианты запросов; execution_options=NO_CACHE компилирует SQL при каждом вызове
+def legacy_history(session, partner_id, execution_options=None):
+    return (
+        session.query(PartnerProduct, Product)
+        .join(Product, PartnerProduct.product_id == Product.id)
+        .filter(PartnerProduct.partner_id == partner_id)
+        .order_by(PartnerProduct.sale_date.desc())
+        .execution_options(**(execution_options or {}))
+        .all()
+    )
+
+
+def legacy_coefficients(session, product_type_id, material_type_id, execution_options=None):
+    warnings.simplefilter("ignore", LegacyAPIWarning)
+    options = execution_options or {}
+    product_type = session.query(ProductType).execution_options(**options).get(product_type_id)
+    material_type = session.query(MaterialType).execution_options(**options).get(material_type_id)
+    return product_type.coefficient, material_type.defect_percentage
+
+
+def legacy_rank(session, limit, execution_options=None):
+    # Запрос собирался заново при каждом вызове rank_partners
+    totals = (
+        session.query(
+            PartnerProduct.partner_id.label("partner_id"),
+            func.sum(PartnerProduct.quantity).label("total_qty"),
+        )
+        .group_by(PartnerProduct.partner_id)
+        .subquery()
+    )
+    total_qty = func.coalesce(totals.c.total_qty, 0)
+    return (
+        session.query(Partner, total_qty, discount_expr(total_qty),
+                      func.dense_rank().over(order_by=total_qty.desc()))
+        .join(Partner.partner_type)
+        .options(contains_eager(Partner.partner_type))
+        .outerjoin(totals, totals.c.partner_id == Partner.id)
+        .order_by(total_qty.desc(), Partner.name)
+        .offset(0)
+        .limit(limit)
+        .execution_options(**(execution_options or {}))
+        .all()
+    )
+
+
+# Текущие варианты
+def history(session, partner_id, execution_options=None):
+    return session.execute(
+        HISTORY_STMT, {"partner_id": partner_id},
+        execution_options=execution_options or {},
+    ).all()
+
+
+def coefficients(session, product_type_id, material_type_id, execution_options=None):
+    return session.execute(
+        COEFFICIENTS_STMT,
+        {"product_type_id": product_type_id, "material_type_id": material_type_id},
+        execution_options=execution_options or {},
+    ).first()
+
+
+def rank(session, limit, execution_options=None):
+    return session.execute(
+        RANK_STMTS[SORT_TOTAL_QTY],
+        {"partner_type_id": None, "min_discount": None, "min_rating": None,
+         "limit": NO_LIMIT if limit is None else limit, "offset": 0},
+        execution_options=execution_options or {},
+    ).all()
+
+
+def _per_call_us(fn, calls: int) -> float:
+    with Session(ENGINE) as session:
+        fn(session)  # прогрев кэша компиляции
+        session.expunge_all()
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            fn(session)
+            # Не даем карте идентичности ускорить повторную загрузку объектов
+            session.expunge_all()
+        return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарк частых запросов")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    with Session(ENGINE) as session:
+        partner_id = session.query(Partner.id).order_by(Partner.id).limit(1).scalar()
+        product_type_id = session.query(ProductType.id).limit(1).scalar()
+        material_type_id = session.query(MaterialType.id).limit(1).scalar()
+
+    cases = [
+        ("история продаж партнера",
+         lambda s, o=None: legacy_history(s, partner_id, o),
+         lambda s, o=None: history(s, partner_id, o)),
+        ("коэффициенты расчета материала",
+         lambda s, o=None: legacy_coefficients(s, product_type_id, material_type_id, o),
+         lambda s, o=None: coefficients(s, product_type_id, material_type_id, o)),
+        ("суммы продаж партнеров (50)",
+         lambda s, o=None: legacy_rank(s, 50, o),
+         lambda s, o=None: rank(s, 50, o)),
+    ]
+    print(f"{'':<32} {'прежний, мкс':>21} {'текущий, мкс':>21}")
+    print(f"{'запрос':<32} {'без кэша':>10} {'с кэшем':>10} {'без кэша':>10} {'с кэшем':>10} "
+          f"{'запрос':>8} {'кэш':>6}")
+    for name, legacy, current in cases:
+        t_legacy_uncached = _per_call_us(lambda s: legacy(s, NO_CACHE), args.calls)
+        t_legacy = _per_call_us(legacy, args.calls)
+        t_uncached = _per_call_us(lambda s: current(s, NO_CACHE), args.calls)
+        t_cached = _per_call_us(current, args.calls)
+        print(f"{name:<32} {t_legacy_uncached:10.1f} {t_legacy:10.1f} {t_uncached:10.1f} "
+              f"{t_cached:10.1f} {t_legacy / t_cached:7.1f}× {t_uncached / t_cached:5.1f}×")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+bulk_load.py — быстрая первичная загрузка базы
+---------------------------------------------
+
+Функции:
+* Загрузка таблиц Excel в пустую базу пакетными вставками (executemany)
+  с сопоставлением наименований и идентификаторов средствами pandas
+* Отложенное построение вторичных индексов и проверка внешних ключей
+  одним проходом после вставки
+* Вставка продаж, отсортированных по (partner_id, sale_date)
+* Замер времени каждого этапа
+
+Запуск: python DB_prepare.py --bulk. Режим предназначен для первичного
+заполнения новой базы: на время загрузки отключаются журнал и fsync,
+поэтому приложение и другие процессы не должны работать с базой.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+import pandas as pd
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from DB_prepare import Base, EXCEL_FILES
+from memory_profile import memory_stage
+from import_validation import (reject_listed, reject_unknown, rejected_names,
+                               validate_partner_products, validate_partners)
+
+
+def _none_if_na(df: pd.DataFrame) -> pd.DataFrame:
+    """Замена NaN/NaT на None для передачи в sqlite3"""
+    return df.astype(object).where(df.notna(), None)
+
+
+def _rows(df: pd.DataFrame):
+    return df.itertuples(index=False, name=None)
+
+
+def _first_ids(ids: pd.Series) -> pd.Series:
+    """
+    Соответствие наименование → id для map: при повторяющихся наименованиях
+    берется первая запись, как при поиске .first() в DB_prepare.load_data
+    """
+    return ids[~ids.index.duplicated(keep="first")]
+
+
+def load_data_bulk(engine: Engine, db_path: Path) -> Tuple[dict, Dict[str, float]]:
+    """
+    Загрузка данных из Excel в пустую базу.
+
+    Аргументы:
+        engine: Движок SQLAlchemy (используется для DDL индексов)
+        db_path: Путь к файлу базы
+
+    Возвращает:
+        Кортеж (отклоненные строки по таблицам, время этапов в секундах)
+    """
+    timings: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(name):
+        t0 = time.perf_counter()
+        with memory_stage(f"быстрая загрузка: {name}"):
+            yield
+        timings[name] = time.perf_counter() - t0
+
+    rejects = {}
+    with phase("чтение и проверка Excel"):
+        df_ptypes = pd.read_excel(EXCEL_FILES["product_types"])
+        df_products = pd.read_excel(EXCEL_FILES["products"])
+        df_mtypes = pd.read_excel(EXCEL_FILES["material_types"])
+        df_partners, rejects["partners"] = validate_partners(
+            pd.read_excel(EXCEL_FILES["partners"])
+        )
+        df_pp, bad_pp = validate_partner_products(
+            pd.read_excel(EXCEL_FILES["partner_products"])
+        )
+
+    with phase("подготовка строк"):
+        # Идентификаторы назначаются здесь, ссылки сопоставляются через map
+        ptype_ids = pd.Series(range(1, len(df_ptypes) + 1),
+                              index=df_ptypes["Тип продукции"])
+        df_products, rejects["products"] = reject_unknown(
+            df_products, "Тип продукции", ptype_ids.index, "тип продукции не найден"
+        )
+        product_ids = pd.Series(range(1, len(df_products) + 1),
+                                index=df_products["Наименование продукции"])
+        partner_type_names = df_partners["Тип партнера"].drop_duplicates()
+        partner_type_ids = pd.Series(range(1, len(partner_type_names) + 1),
+                                     index=partner_type_names)
+        partner_ids = pd.Series(range(1, len(df_partners) + 1),
+                                index=df_partners["Наименование партнера"])
+
+        df_pp, bad_rejected = reject_listed(
+            df_pp, "Наименование партнера",
+            rejected_names(rejects["partners"], df_partners, "Наименование партнера"),
+            "партнер отклонен при проверке (см. лист partners)",
+        )
+        df_pp, bad_partner = reject_unknown(
+            df_pp, "Наименование партнера", partner_ids.index, "партнер не найден"
+        )
+        df_pp, bad_product = reject_unknown(
+            df_pp, "Продукция", product_ids.index, "продукция не найдена"
+        )
+        rejects["partner_products"] = pd.concat([bad_pp, bad_rejected, bad_partner, bad_product])
+
+        sales = pd.DataFrame({
+            "partner_id": df_pp["Наименование партнера"].map(_first_ids(partner_ids)).to_numpy(),
+            "product_id": df_pp["Продукция"].map(_first_ids(product_ids)).to_numpy(),
+            "quantity": df_pp["Количество продукции"].to_numpy(),
+            "sale_date": df_pp["Дата продажи"].dt.strftime("%Y-%m-%d").to_numpy(),
+        })
+        # Строки одного партнера ложатся в файл подряд, в порядке дат
+        sales = sales.sort_values(["partner_id", "sale_date"], kind="stable")
+
+    indexes = [idx for table in Base.metadata.sorted_tables for idx in table.indexes]
+
+    con = sqlite3.connect(db_path, isolation_level=None)
+    journal_mode = con.execute("PRAGMA journal_mode").fetchone()[0]
+    try:
+        if con.execute("SELECT COUNT(*) FROM partners").fetchone()[0]:
+            raise RuntimeError("Быстрая загрузка выполняется только в пустую базу")
+
+        with phase("удаление индексов"):
+            for idx in indexes:
+                con.execute(f'DROP INDEX IF EXISTS "{idx.name}"')
+            con.execute("PRAGMA foreign_keys = OFF")
+            con.execute("PRAGMA journal_mode = OFF")
+            con.execute("PRAGMA synchronous = OFF")
+            con.execute("PRAGMA cache_size = -262144")  # 256 МБ
+
+        with phase("вставка строк"):
+            con.execute("BEGIN")
+            con.executemany(
+                "INSERT INTO product_types (id, name, coefficient) VALUES (?, ?, ?)",
+                _rows(_none_if_na(pd.DataFrame({
+                    "id": ptype_ids.to_numpy(),
+                    "name": ptype_ids.index,
+                    "coefficient": df_ptypes["Коэффициент типа продукции"].to_numpy(),
+                }))),
+            )
+            con.executemany(
+                "INSERT INTO products (id, product_type_id, article, name, min_partner_price) "
+                "VALUES (?, ?, ?, ?, ?)",
+                _rows(_none_if_na(pd.DataFrame({
+                    "id": product_ids.to_numpy(),
+                    "product_type_id": df_products["Тип продукции"].map(_first_ids(ptype_ids)).to_numpy(),
+                    "article": df_products["Артикул"].to_numpy(),
+                    "name": product_ids.index,
+                    "price": df_products["Минимальная стоимость для партнера"].to_numpy(),
+                }))),
+            )
+            con.executemany(
+                "INSERT INTO material_types (name, defect_percentage) VALUES (?, ?)",
+                _rows(_none_if_na(df_mtypes[["Тип материала", "Процент брака материала "]])),
+            )
+            con.executemany(
+                "INSERT INTO partner_types (id, name) VALUES (?, ?)",
+                zip(partner_type_ids.tolist(), partner_type_ids.index),
+            )
+            con.executemany(
+                "INSERT INTO partners (id, partner_type_id, name, legal_address, inn, "
+                "director, phone, email, rating) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _rows(_none_if_na(pd.DataFrame({
+                    "id": partner_ids.to_numpy(),
+                    "partner_type_id": df_partners["Тип партнера"].map(partner_type_ids).to_numpy(),
+                    "name": partner_ids.index,
+                    "legal_address": df_partners["Юридический адрес партнера"].to_numpy(),
+                    "inn": df_partners["ИНН"].to_numpy(),
+                    "director": df_partners["Директор"].to_numpy(),
+                    "phone": df_partners["Телефон партнера"].to_numpy(),
+                    "email": df_partners["Электронная почта партнера"].to_numpy(),
+                    "rating": df_partners["Рейтинг"].to_numpy(),
+                }))),
+            )
+            con.executemany(
+                "INSERT INTO partner_products (partner_id, product_id, quantity, sale_date) "
+                "VALUES (?, ?, ?, ?)",
+                _rows(_none_if_na(sales)),
+            )
+            con.execute("COMMIT")
+
+        with phase("построение индексов"):
+            for idx in indexes:
+                con.execute(str(CreateIndex(idx).compile(dialect=engine.dialect)))
+
+        with phase("ANALYZE"):
+            con.execute("ANALYZE")
+
+        with phase("проверка внешних ключей"):
+            violations = con.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            raise RuntimeError(
+                f"Нарушения внешних ключей после загрузки: {len(violations)}, "
+                f"например {violations[:5]}"
+            )
+    finally:
+        con.execute(f"PRAGMA journal_mode = {journal_mode}")
+        con.close()
+
+    return rejects, timings
@@ -0,0 +1,224 @@
+"""
+db_writer.py — единая очередь записи в базу данных
+-------------------------------------------------
+
+Функции:
+* Выделенный поток-писатель, через который проходят все изменения app.db
+* Объединение накопившихся заданий в общие транзакции
+* Возврат Future вызывающему коду
+* Ожидание блокировки (busy timeout) и повтор транзакции при "database is locked"
+"""
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+# Маркер остановки потока
+_STOP = object()
+
+
+def _is_locked_error(exc: OperationalError) -> bool:
+    """Проверка, что ошибка вызвана блокировкой базы другим процессом"""
+    text = str(exc.orig).lower()
+    return "locked" in text or "busy" in text
+
+
+def make_writer_engine(url, busy_timeout: float = 5.0) -> Engine:
+    """
+    Создание движка для потока-писателя.
+
+    Транзакции открываются через BEGIN IMMEDIATE, чтобы блокировка записи
+    бралась сразу, а не при первом изменении: так конкурирующий процесс
+    получает "busy" в начале транзакции, а не посередине группы заданий.
+
+    Аргументы:
+        url: URL базы данных SQLite
+        busy_timeout: Время ожидания снятия блокировки, в секундах
+
+    Возвращает:
+        Движок SQLAlchemy
+    """
+    engine = create_engine(
+        url,
+        echo=False,
+        future=True,
+        connect_args={"timeout": busy_timeout, "check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        # Отключаем собственное управление транзакциями pysqlite,
+        # иначе SAVEPOINT не работают внутри общей транзакции
+        dbapi_conn.isolation_level = None
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+class DBWriter:
+    """
+    Поток-писатель с очередью заданий.
+
+    Задание — функция вида fn(session, *args, **kwargs). Все задания,
+    накопившиеся в очереди, выполняются в одной транзакции; каждое
+    задание оборачивается в SAVEPOINT, поэтому ошибка одного задания
+    не отменяет остальные.
+    """
+
+    def __init__(
+        self,
+        url,
+        batch_size: int = 64,
+        batch_window: float = 0.005,
+        busy_timeout: float = 5.0,
+        retries: int = 5,
+        retry_delay: float = 0.05,
+    ):
+        self.engine = make_writer_engine(url, busy_timeout)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._commit_hooks: list[Callable[[], None]] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Постановка задания в очередь записи.
+
+        Возвращает:
+            Future с результатом fn или исключением
+        """
+        if self._closed:
+            raise RuntimeError("Поток записи остановлен")
+        job = _Job(fn, args, kwargs)
+        self._queue.put(job)
+        return job.future
+
+    def add_commit_hook(self, hook: Callable[[], None]):
+        """
+        Регистрация функции, вызываемой в потоке записи после каждой
+        успешной фиксации транзакции, до выдачи результатов заданиям.
+        """
+        self._commit_hooks.append(hook)
+
+    def close(self, wait: bool = True):
+        """Остановка потока после выполнения уже поставленных заданий"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        if wait:
+            self._thread.join()
+        self.engine.dispose()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = self._collect(batch)
+            self._apply_batch(batch)
+            if stop:
+                return
+
+    def _collect(self, batch: list) -> bool:
+        """Добор заданий в группу в пределах окна ожидания"""
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                return False
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _apply_batch(self, batch: list):
+        jobs = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+
+        for attempt in range(self.retries + 1):
+            outcomes = []
+            try:
+                with Session(self.engine, expire_on_commit=False) as session:
+                    for job in jobs:
+                        try:
+                            with session.begin_nested():
+                                outcomes.append((True, job.fn(session, *job.args, **job.kwargs)))
+                        except OperationalError as exc:
+                            if _is_locked_error(exc):
+                                raise
+                            outcomes.append((False, exc))
+                        except Exception as exc:
+                            outcomes.append((False, exc))
+                    session.commit()
+                break
+            except OperationalError as exc:
+                if not _is_locked_error(exc) or attempt == self.retries:
+                    for job in jobs:
+                        job.future.set_exception(exc)
+                    return
+                time.sleep(self.retry_delay * (2 ** attempt))
+            except Exception as exc:
+                for job in jobs:
+                    job.future.set_exception(exc)
+                return
+
+        for hook in self._commit_hooks:
+            hook()
+
+        for job, (ok, value) in zip(jobs, outcomes):
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+
+_writer: Optional[DBWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> DBWriter:
+    """Общий поток-писатель приложения для app.db"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            from DB_prepare import ENGINE
+
+            _writer = DBWriter(ENGINE.url)
+            atexit.register(_writer.close)
+        return _writer
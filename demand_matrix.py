@@ -0,0 +1,282 @@
+"""
+demand_matrix.py — матрица спроса партнер × продукция
+----------------------------------------------------
+
+Функции:
+* Разреженная матрица объемов продаж партнер × продукция в формате CSR
+  (массивы NumPy по целочисленным идентификаторам) в двух ориентациях:
+  строки по партнерам и строки по продукции
+* Построение за один потоковый проход по partner_products: строки
+  читаются пакетами и суммируются средствами NumPy
+* Дозагрузка новых продаж (id больше последнего учтенного) без
+  перестроения: новые суммы копятся в дельте и сливаются с матрицей,
+  когда дельта становится большой
+* Первые N партнеров по продукции и первые N продукции по партнеру —
+  срез строки CSR и argpartition, без запросов к базе
+
+Матрица после построения не меняется: дозагрузка создает новый объект,
+а get_demand_matrix подменяет его одним присваиванием. Поток интерфейса
+читает полученный снимок без блокировок, пока фоновый поток готовит
+следующий.
+
+Удаление и изменение уже учтенных продаж дозагрузкой не отслеживается
+(в приложении их нет; перенос в архив строки не удаляет — см.
+sales_archive). Если наибольший id продаж уменьшился, матрица строится
+заново; в остальных случаях — rebuild_demand_matrix().
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from DB_prepare import ARCHIVE_DIR, ENGINE
+from sales_archive import archived_max_id
+
+FETCH_ROWS = 65_536
+# Размер дельты (число пар партнер–продукция), после которого она сливается с матрицей
+MERGE_THRESHOLD = 10_000
+
+_KEY_SHIFT = np.int64(1 << 32)
+
+_SALES_SQL = (
+    "SELECT partner_id, product_id, coalesce(quantity, 0), id "
+    "FROM partner_products WHERE id > ?"
+)
+# Только текущая таблица: max(id) по объединяющему представлению с архивами
+# читал бы все разделы; наибольший id архивов берется из archived_max_id
+_MAX_ID_SQL = text("SELECT max(id) FROM main.partner_products")
+
+
+class CSR:
+    """Строки разреженной матрицы: значения строки r — indices/data[indptr[r]:indptr[r + 1]]"""
+
+    __slots__ = ("indptr", "indices", "data")
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_sorted(cls, rows: np.ndarray, cols: np.ndarray, data: np.ndarray) -> "CSR":
+        """Построение из троек, отсортированных по (строка, столбец), без повторов"""
+        n_rows = int(rows[-1]) + 1 if len(rows) else 0
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(indptr, cols.astype(np.int32), data)
+
+    def row(self, r: int) -> Tuple[np.ndarray, np.ndarray]:
+        if r < 0 or r + 1 >= len(self.indptr):
+            return self.indices[:0], self.data[:0]
+        start, end = self.indptr[r], self.indptr[r + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def triplets(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        return rows, self.indices.astype(np.int64), self.data
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+
+def _aggregate(partners: np.ndarray, products: np.ndarray, quantities: np.ndarray):
+    """Суммирование повторяющихся пар; результат отсортирован по (партнер, продукция)"""
+    keys = partners.astype(np.int64) * _KEY_SHIFT + products.astype(np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=quantities, minlength=len(unique)).astype(np.int64)
+    return unique // _KEY_SHIFT, unique % _KEY_SHIFT, sums
+
+
+def _top(indices: np.ndarray, data: np.ndarray, k: int) -> List[Tuple[int, int]]:
+    """k наибольших значений строки по убыванию: [(столбец, значение)]"""
+    if k <= 0:
+        return []
+    if len(data) > k:
+        part = np.argpartition(data, -k)[-k:]
+        indices, data = indices[part], data[part]
+    order = np.lexsort((indices, -data))
+    return [(int(indices[i]), int(data[i])) for i in order]
+
+
+class DemandMatrix:
+    def __init__(self, partners: np.ndarray, products: np.ndarray,
+                 quantities: np.ndarray, high_water: int):
+        """
+        Аргументы:
+            partners, products, quantities: Суммы по парам, отсортированные
+                по (партнер, продукция), без повторов
+            high_water: Наибольший учтенный id продажи
+        """
+        self.high_water = high_water
+        self.by_partner = CSR.from_sorted(partners, products, quantities)
+        order = np.lexsort((partners, products))
+        self.by_product = CSR.from_sorted(products[order], partners[order], quantities[order])
+        # Дельта новых продаж в обеих ориентациях: {строка: {столбец: количество}}
+        self._delta_by_partner: Dict[int, Dict[int, int]] = {}
+        self._delta_by_product: Dict[int, Dict[int, int]] = {}
+        self._delta_size = 0
+
+    @classmethod
+    def build(cls, engine: Engine = ENGINE) -> "DemandMatrix":
+        """Построение за один проход по partner_products"""
+        with engine.connect() as conn:
+            partners, products, quantities, high_water = _read_sales(conn, 0)
+        return cls(*_aggregate(partners, products, quantities), high_water)
+
+    # Запросы
+    def top_partners(self, product_id: int, k: int = 10) -> List[Tuple[int, int]]:
+        """Партнеры с наибольшим объемом закупок продукции: [(id партнера, количество)]"""
+        indices, data = _with_delta(self.by_product.row(product_id),
+                                    self._delta_by_product.get(product_id))
+        return _top(indices, data, k)
+
+    def top_products(self, partner_id: int, k: int = 10) -> List[Tuple[int, int]]:
+        """Продукция с наибольшим объемом закупок партнера: [(id продукции, количество)]"""
+        indices, data = _with_delta(self.by_partner.row(partner_id),
+                                    self._delta_by_partner.get(partner_id))
+        return _top(indices, data, k)
+
+    def product_total(self, product_id: int) -> int:
+        _, data = _with_delta(self.by_product.row(product_id),
+                              self._delta_by_product.get(product_id))
+        return int(data.sum())
+
+    def partner_total(self, partner_id: int) -> int:
+        _, data = _with_delta(self.by_partner.row(partner_id),
+                              self._delta_by_partner.get(partner_id))
+        return int(data.sum())
+
+    @property
+    def nnz(self) -> int:
+        return len(self.by_partner.data) + self._delta_size
+
+    @property
+    def nbytes(self) -> int:
+        return self.by_partner.nbytes + self.by_product.nbytes
+
+    # Дозагрузка
+    def apply_sales(self, partners: np.ndarray, products: np.ndarray,
+                    quantities: np.ndarray, high_water: int) -> "DemandMatrix":
+        """
+        Матрица с учетом новых продаж. Текущий объект не меняется: суммы
+        попадают в копию дельты, большая дельта сливается с матрицей.
+        """
+        delta_by_partner = {r: dict(row) for r, row in self._delta_by_partner.items()}
+        delta_by_product = {r: dict(row) for r, row in self._delta_by_product.items()}
+        delta_size = self._delta_size
+        for partner_id, product_id, qty in zip(*(a.tolist() for a in
+                                                 _aggregate(partners, products, quantities))):
+            row = delta_by_partner.setdefault(partner_id, {})
+            if product_id not in row:
+                delta_size += 1
+            row[product_id] = row.get(product_id, 0) + qty
+            col = delta_by_product.setdefault(product_id, {})
+            col[partner_id] = col.get(partner_id, 0) + qty
+        high_water = max(self.high_water, high_water)
+        if delta_size > MERGE_THRESHOLD:
+            return DemandMatrix(*_merge(self.by_partner, delta_by_partner), high_water)
+        matrix = copy.copy(self)
+        matrix._delta_by_partner = delta_by_partner
+        matrix._delta_by_product = delta_by_product
+        matrix._delta_size = delta_size
+        matrix.high_water = high_water
+        return matrix
+
+
+def _merge(by_partner: CSR, delta_by_partner: Dict[int, Dict[int, int]]):
+    """Слияние матрицы с дельтой; результат — суммы по парам для DemandMatrix"""
+    rows, cols, data = by_partner.triplets()
+    d_rows, d_cols, d_data = [], [], []
+    for partner_id, row in delta_by_partner.items():
+        for product_id, qty in row.items():
+            d_rows.append(partner_id)
+            d_cols.append(product_id)
+            d_data.append(qty)
+    return _aggregate(
+        np.concatenate([rows, np.asarray(d_rows, dtype=np.int64)]),
+        np.concatenate([cols, np.asarray(d_cols, dtype=np.int64)]),
+        np.concatenate([data, np.asarray(d_data, dtype=np.int64)]),
+    )
+
+
+def _read_sales(conn, after: int):
+    """Потоковое чтение продаж с id больше after пакетами по FETCH_ROWS строк"""
+    # Курсор DBAPI: кортежи sqlite3 превращаются в массив NumPy на порядок
+    # быстрее, чем строки результата SQLAlchemy
+    cursor = conn.connection.cursor()
+    cursor.execute(_SALES_SQL, (after,))
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.int64))
+    cursor.close()
+    if not chunks:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, after
+    sales = np.concatenate(chunks)
+    return sales[:, 0], sales[:, 1], sales[:, 2], int(sales[:, 3].max())
+
+
+def _with_delta(row: Tuple[np.ndarray, np.ndarray], delta: Optional[Dict[int, int]]):
+    indices, data = row
+    if not delta:
+        return indices, data
+    extra_idx = np.fromiter(delta.keys(), dtype=np.int64, count=len(delta))
+    extra_val = np.fromiter(delta.values(), dtype=np.int64, count=len(delta))
+    # Столбцы строки отсортированы: существующие находятся бинарным поиском
+    pos = np.searchsorted(indices, extra_idx)
+    found = np.zeros(len(extra_idx), dtype=bool)
+    inside = pos < len(indices)
+    found[inside] = indices[pos[inside]] == extra_idx[inside]
+    data = data.copy()
+    data[pos[found]] += extra_val[found]
+    return (np.concatenate([indices, extra_idx[~found].astype(indices.dtype)]),
+            np.concatenate([data, extra_val[~found]]))
+
+
+_matrix: Optional[DemandMatrix] = None
+_matrix_lock = threading.Lock()
+last_build_seconds: Optional[float] = None
+
+
+def get_demand_matrix(engine: Engine = ENGINE) -> DemandMatrix:
+    """
+    Матрица спроса с учетом продаж, добавленных с прошлого вызова.
+
+    Первый вызов строит матрицу; последующие читают только продажи
+    с id больше последнего учтенного (поиск по первичному ключу).
+    Возвращаемый объект не меняется и может читаться из любого потока.
+    """
+    global _matrix, last_build_seconds
+    with _matrix_lock:
+        if _matrix is not None:
+            with engine.connect() as conn:
+                max_id = max(conn.execute(_MAX_ID_SQL).scalar() or 0,
+                             archived_max_id(ARCHIVE_DIR))
+                if max_id < _matrix.high_water:
+                    # Продажи удалены: дозагрузкой не восстановить
+                    _matrix = None
+                elif max_id > _matrix.high_water:
+                    _matrix = _matrix.apply_sales(*_read_sales(conn, _matrix.high_water))
+        if _matrix is None:
+            t0 = time.perf_counter()
+            _matrix = DemandMatrix.build(engine)
+            last_build_seconds = time.perf_counter() - t0
+        return _matrix
+
+
+def rebuild_demand_matrix(engine: Engine = ENGINE) -> DemandMatrix:
+    """Построение матрицы заново (после удаления или изменения продаж)"""
+    global _matrix
+    with _matrix_lock:
+        _matrix = None
+    return get_demand_matrix(engine)
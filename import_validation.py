@@ -0,0 +1,210 @@
+"""
+import_validation.py — проверка данных при импорте
+-------------------------------------------------
+
+Функции:
+* Проверка целых столбцов таблиц импорта векторными операциями pandas
+* Нормализация ИНН, рейтинга и дат перед вставкой в базу
+* Формирование отчета об отклоненных строках с причинами
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Iterable, Tuple
+
+import pandas as pd
+
+EMAIL_RE = re.compile(r"^[\w\.-]+@[\w\.-]+\.[A-Za-z]{2,}$")
+PHONE_RE = re.compile(r"^[\d\s\-\+\(\)]+$")
+INN_RE = re.compile(r"^\d{10}$")
+
+RATING_MIN = 0
+RATING_MAX = 100
+
+REASON_COLUMN = "Причина отклонения"
+
+
+def _present(col: pd.Series) -> pd.Series:
+    """Маска непустых значений (NaN и пустые строки считаются пропуском)"""
+    return col.notna() & (col.astype("string").str.strip() != "")
+
+
+def _split(df: pd.DataFrame, checks: Iterable[Tuple[pd.Series, str]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Разделение таблицы на корректные и отклоненные строки.
+
+    Аргументы:
+        df: Исходная таблица
+        checks: Пары (маска ошибочных строк, текст причины)
+
+    Возвращает:
+        Кортеж (корректные строки, отклоненные строки с причинами)
+    """
+    reasons = pd.Series("", index=df.index, dtype="string")
+    for bad, reason in checks:
+        bad = bad.fillna(False).astype(bool)
+        reasons = reasons.mask(bad, reasons + reason + "; ")
+    rejected_mask = reasons != ""
+    rejected = df[rejected_mask].copy()
+    rejected[REASON_COLUMN] = reasons[rejected_mask].str.rstrip("; ")
+    return df[~rejected_mask], rejected
+
+
+def normalize_inn(col: pd.Series) -> pd.Series:
+    """Приведение ИНН к строке; числовые значения дополняются нулями слева до 10 знаков"""
+    if pd.api.types.is_numeric_dtype(col):
+        text = col.astype("Int64").astype("string")
+    else:
+        text = col.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    return text.str.zfill(10)
+
+
+def parse_dates(col: pd.Series) -> pd.Series:
+    """
+    Разбор дат столбцом: сначала формат ДД.ММ.ГГГГ, затем ISO 8601
+    для оставшихся значений. Неразобранные значения становятся NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    parsed = pd.to_datetime(col, format="%d.%m.%Y", errors="coerce")
+    rest = parsed.isna() & col.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(col[rest], format="ISO8601", errors="coerce")
+    return parsed
+
+
+def validate_partners(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Проверка таблицы партнеров.
+
+    Проверяются: наличие типа и наименования, формат email и телефона,
+    ИНН из 10 цифр, рейтинг в диапазоне 0–100.
+
+    Аргументы:
+        df: Таблица из Partners_import.xlsx
+
+    Возвращает:
+        Кортеж (корректные строки с нормализованными ИНН и рейтингом,
+        отклоненные строки с причинами)
+    """
+    email = df["Электронная почта партнера"].astype("string").str.strip()
+    phone = df["Телефон партнера"].astype("string").str.strip()
+    inn = normalize_inn(df["ИНН"])
+    rating = pd.to_numeric(df["Рейтинг"], errors="coerce")
+
+    checks = [
+        (~_present(df["Тип партнера"]), "не указан тип партнера"),
+        (~_present(df["Наименование партнера"]), "не указано наименование"),
+        (_present(email) & ~email.str.match(EMAIL_RE.pattern), "некорректный email"),
+        (_present(phone) & ~phone.str.match(PHONE_RE.pattern), "телефон содержит недопустимые символы"),
+        (inn.notna() & ~inn.str.match(INN_RE.pattern), "ИНН должен состоять из 10 цифр"),
+        (df["Рейтинг"].notna() & rating.isna(), "рейтинг не является числом"),
+        (
+            rating.notna() & ((rating < RATING_MIN) | (rating > RATING_MAX) | (rating % 1 != 0)),
+            f"рейтинг вне диапазона {RATING_MIN}–{RATING_MAX}",
+        ),
+    ]
+    valid, rejected = _split(df, checks)
+    valid = valid.assign(
+        **{
+            "ИНН": inn[valid.index],
+            "Рейтинг": rating[valid.index].astype("Int64"),
+        }
+    )
+    return valid, rejected
+
+
+def validate_partner_products(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Проверка таблицы продаж партнеров.
+
+    Проверяются: наличие партнера и продукции, целое положительное
+    количество, корректность даты продажи.
+
+    Аргументы:
+        df: Таблица из Partner_products_import.xlsx
+
+    Возвращает:
+        Кортеж (корректные строки с разобранными датами,
+        отклоненные строки с причинами)
+    """
+    qty = pd.to_numeric(df["Количество продукции"], errors="coerce")
+    raw_date = df["Дата продажи"]
+    sale_date = parse_dates(raw_date)
+
+    checks = [
+        (~_present(df["Наименование партнера"]), "не указан партнер"),
+        (~_present(df["Продукция"]), "не указана продукция"),
+        (qty.isna() | (qty <= 0) | (qty % 1 != 0), "количество должно быть целым положительным числом"),
+        (raw_date.notna() & sale_date.isna(), "некорректная дата продажи"),
+    ]
+    valid, rejected = _split(df, checks)
+    valid = valid.assign(
+        **{
+            "Количество продукции": qty[valid.index].astype("int64"),
+            "Дата продажи": sale_date[valid.index],
+        }
+    )
+    return valid, rejected
+
+
+def reject_unknown(df: pd.DataFrame, column: str, known: Iterable, reason: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Отклонение строк со ссылками на отсутствующие в базе записи.
+
+    Аргументы:
+        df: Проверяемая таблица
+        column: Столбец со ссылкой (например, наименование партнера)
+        known: Допустимые значения столбца
+        reason: Текст причины отклонения
+
+    Возвращает:
+        Кортеж (корректные строки, отклоненные строки с причинами)
+    """
+    return _split(df, [(~df[column].isin(list(known)), reason)])
+
+
+def reject_listed(df: pd.DataFrame, column: str, listed: Iterable, reason: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Отклонение строк со ссылками на записи, отклоненные раньше
+    (например, продаж партнера, не прошедшего проверку).
+
+    Аргументы:
+        df: Проверяемая таблица
+        column: Столбец со ссылкой
+        listed: Отклоненные значения столбца
+        reason: Текст причины отклонения
+
+    Возвращает:
+        Кортеж (корректные строки, отклоненные строки с причинами)
+    """
+    return _split(df, [(df[column].isin(list(listed)), reason)])
+
+
+def rejected_names(rejected: pd.DataFrame, valid: pd.DataFrame, column: str) -> set:
+    """Значения столбца, встречающиеся только среди отклоненных строк"""
+    return set(rejected[column].dropna()) - set(valid[column].dropna())
+
+
+def write_reject_report(rejects: dict[str, pd.DataFrame], path: Path) -> int:
+    """
+    Запись отклоненных строк в книгу Excel, по листу на таблицу импорта.
+
+    Аргументы:
+        rejects: Отклоненные строки по имени таблицы
+        path: Путь к файлу отчета
+
+    Возвращает:
+        Общее количество отклоненных строк (0 — файл не создается,
+        отчет прошлого импорта удаляется, чтобы не вводить в заблуждение)
+    """
+    rejects = {name: df for name, df in rejects.items() if not df.empty}
+    total = sum(len(df) for df in rejects.values())
+    if not total:
+        Path(path).unlink(missing_ok=True)
+        return 0
+    with pd.ExcelWriter(path) as writer:
+        for name, df in rejects.items():
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+    return total
@@ -1,10 +1,16 @@
 from __future__ import annotations
-import re
+import logging
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from PySide6.QtCore import Qt, Signal, QSize
+# Отсчет времени запуска — до импорта Qt и SQLAlchemy
+_STARTED_AT = time.perf_counter()
+
+from PySide6.QtCore import Qt, Signal, QSize, QTimer
 from PySide6.QtGui import QFont, QIcon, QPainter, QPen, QColor, QMouseEvent, QPixmap
 from PySide6.QtWidgets import (
     QApplication,
@@ -23,18 +29,34 @@ from PySide6.QtWidgets import (
     QComboBox,
     QFrame,
 )
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
-
-from DB_prepare import ENGINE, Partner, PartnerType
-from partner_discount import calculate_discount, get_partner_total_qty
+from sqlalchemy.orm import Session, joinedload
+
+from DB_prepare import DB_PATH, ENGINE, Partner, PartnerType
+from db_writer import get_writer
+from import_validation import EMAIL_RE, PHONE_RE
+from memory_profile import memory_stage
+from read_replica import enable_read_replica
+from material_planning import ensure_bom_table
+from sales_archive import hold_app_lock
+from sales_layout import ensure_indexes
+from partner_discount import DISCOUNT_TIERS
+from partner_list_cache import (CachedList, DataVersionWatcher, card_from_rank,
+                                db_fingerprint, load_cache, save_cache)
+from partner_ranking import (SORT_DISCOUNT, SORT_NAME, SORT_RATING, SORT_TOTAL_QTY,
+                             partner_type_choices, rank_partners)
 from partner_product_history import PartnerProductHistoryPage
 from material_calculator_page import MaterialCalculatorPage
+from product_demand_page import ProductDemandPage
 
 BASE_DIR = Path(__file__).resolve().parent
 APP_ICON_PATH     = BASE_DIR / "resources" / "app_icon.ico"
 COMPANY_LOGO_PATH = BASE_DIR / "resources" / "company_logo.png"
 
+log = logging.getLogger(__name__)
+
+# Фоновая загрузка данных страниц, чтобы не блокировать интерфейс
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-loader")
+
 def show_message(parent: QWidget, icon: QMessageBox.Icon, title: str, text: str, details: str = ""):
     box = QMessageBox(parent)
     box.setIcon(icon)
@@ -138,13 +160,55 @@ class SideMenuButton(QPushButton):
             self.setIcon(QIcon(icon_path))
             self.setIconSize(QSize(24, 24))
 
+class SkeletonCard(QFrame):
+    """Заглушка карточки, пока данные партнеров загружаются"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(96)
+        self.setStyleSheet("background-color: #eeeeee; border-radius: 4px;")
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+
 class PartnerListPage(QWidget):
+    # Результат фоновой загрузки: (номер загрузки, параметры отбора, Future)
+    data_loaded = Signal(object)
+    # Карточки построены и видны пользователю
+    data_visible = Signal()
+
+    SKELETON_CARDS = 5
+    # Период проверки изменений базы другими соединениями
+    DATA_VERSION_POLL_MS = 2000
+
     def __init__(self, open_form_cb, open_history_cb, parent=None):
         super().__init__(parent)
         self.open_form_cb = open_form_cb
         self.open_history_cb = open_history_cb
+        self._generation = 0
+        # Показанный список (для кэша на диске) и карточки по id партнера
+        self._shown: Optional[CachedList] = None
+        self._shown_criteria: Optional[dict] = None
+        self._cards: dict[int, tuple] = {}
+        self.data_loaded.connect(self._on_data_loaded)
         self._build_ui()
-        self.refresh()
+
+        # Список с прошлого запуска показывается сразу, с теми же сортировкой
+        # и отбором, затем сверяется с базой. Заполнение откладывается до
+        # цикла событий, чтобы data_visible пришел после подключения к нему
+        # в MainWindow
+        cached = self._restore_cache()
+        if cached is not None:
+            QTimer.singleShot(0, lambda: self._populate(*cached))
+            QTimer.singleShot(0, self.revalidate)
+        else:
+            self._show_skeleton()
+            # Загрузка начинается после первой отрисовки окна
+            QTimer.singleShot(0, self.refresh)
+
+        self._watcher = DataVersionWatcher()
+        self._watch_timer = QTimer(self)
+        self._watch_timer.timeout.connect(self._check_data_version)
+        self._watch_timer.start(self.DATA_VERSION_POLL_MS)
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
@@ -170,6 +234,45 @@ class PartnerListPage(QWidget):
         
         layout.addLayout(header_layout)
 
+        # Сортировка и отбор
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Сортировка:"))
+        self.sort_combo = QComboBox()
+        for text, key in (("По наименованию", SORT_NAME), ("По объему продаж", SORT_TOTAL_QTY),
+                          ("По скидке", SORT_DISCOUNT), ("По рейтингу", SORT_RATING)):
+            self.sort_combo.addItem(text, key)
+        filter_layout.addWidget(self.sort_combo)
+
+        filter_layout.addWidget(QLabel("Тип:"))
+        self.type_filter_combo = QComboBox()
+        self.type_filter_combo.addItem("Все типы", None)
+        filter_layout.addWidget(self.type_filter_combo)
+
+        filter_layout.addWidget(QLabel("Скидка от:"))
+        self.discount_filter_combo = QComboBox()
+        self.discount_filter_combo.addItem("Любая", None)
+        for _, discount in reversed(DISCOUNT_TIERS):
+            self.discount_filter_combo.addItem(f"{discount}%", discount)
+        filter_layout.addWidget(self.discount_filter_combo)
+
+        filter_layout.addWidget(QLabel("Рейтинг от:"))
+        self.rating_filter_spin = QSpinBox()
+        self.rating_filter_spin.setRange(0, 100)
+        filter_layout.addWidget(self.rating_filter_spin)
+
+        filter_layout.addWidget(QLabel("Показать:"))
+        self.limit_combo = QComboBox()
+        for text, limit in (("Всех", None), ("Первые 50", 50), ("Первые 100", 100)):
+            self.limit_combo.addItem(text, limit)
+        filter_layout.addWidget(self.limit_combo)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        for combo in (self.sort_combo, self.type_filter_combo,
+                      self.discount_filter_combo, self.limit_combo):
+            combo.currentIndexChanged.connect(self.refresh)
+        self.rating_filter_spin.valueChanged.connect(self.refresh)
+
         # Список партнеров
         self.scroll = QScrollArea()
         self.scroll.setWidgetResizable(True)
@@ -179,50 +282,222 @@ class PartnerListPage(QWidget):
         self.scroll.setWidget(self.container)
         layout.addWidget(self.scroll)
 
-    def refresh(self):
-        # clear
+    def _clear(self):
         while self.vbox.count():
             it = self.vbox.takeAt(0)
             w = it.widget()
             if w:
                 w.deleteLater()
+        self._cards.clear()
+        self._shown = None
+
+    def _show_skeleton(self):
+        self._clear()
+        for _ in range(self.SKELETON_CARDS):
+            self.vbox.addWidget(SkeletonCard())
+        self.vbox.addStretch()
+
+    def _criteria(self) -> dict:
+        """Параметры сортировки и отбора из элементов управления"""
+        return dict(
+            sort=self.sort_combo.currentData(),
+            partner_type_id=self.type_filter_combo.currentData(),
+            min_discount=self.discount_filter_combo.currentData(),
+            min_rating=self.rating_filter_spin.value() or None,
+            limit=self.limit_combo.currentData(),
+        )
+
+    def _restore_cache(self) -> Optional[tuple[CachedList, dict]]:
+        """
+        Чтение кэша списка и установка элементов управления по его
+        параметрам отбора.
+
+        Возвращает:
+            (CachedList, параметры отбора) или None, если кэша нет или
+            его параметры нельзя установить
+        """
+        loaded = load_cache()
+        if loaded is None:
+            return None
+        criteria, cached = loaded
+        self._update_type_filter(cached.types)
+        for combo, key in ((self.sort_combo, "sort"),
+                           (self.type_filter_combo, "partner_type_id"),
+                           (self.discount_filter_combo, "min_discount"),
+                           (self.limit_combo, "limit")):
+            combo.blockSignals(True)
+            combo.setCurrentIndex(max(combo.findData(criteria.get(key)), 0))
+            combo.blockSignals(False)
+        self.rating_filter_spin.blockSignals(True)
+        self.rating_filter_spin.setValue(criteria.get("min_rating") or 0)
+        self.rating_filter_spin.blockSignals(False)
+        if self._criteria() != criteria:
+            return None
+        return cached, criteria
+
+    def refresh(self):
+        """Запуск фоновой загрузки; карточки строятся по ее завершении"""
+        self._start_load(None)
+
+    def revalidate(self):
+        """Сверка показанного списка с базой; запрос карточек — только если база изменилась"""
+        known = None
+        if self._shown is not None and self._shown_criteria == self._criteria():
+            known = self._shown.fingerprint
+        self._start_load(known)
+
+    def _start_load(self, known_fingerprint: Optional[list]):
+        self._generation += 1
+        generation = self._generation
+        criteria = self._criteria()
+        future = _loader.submit(self._load, criteria, known_fingerprint)
+        future.add_done_callback(lambda f: self.data_loaded.emit((generation, criteria, f)))
+
+    @staticmethod
+    @memory_stage("список партнеров: загрузка")
+    def _load(criteria: dict, known_fingerprint: Optional[list] = None) -> Optional[CachedList]:
         with Session(ENGINE) as session:
-            partners = (
-                session.query(Partner)
-                .join(PartnerType)
-                .order_by(Partner.name)
-                .all()
-            )
-            for p in partners:
-                discount = calculate_discount(get_partner_total_qty(session, p.id))
-                subtitle = [
-                    f"Директор: {p.director or '—'}",
-                    p.phone or "—",
-                    f"Рейтинг: {p.rating or '—'}",
-                ]
-                card = ClickableCard(f"{p.partner_type.name} | {p.name}", subtitle, discount)
-                card.clicked.connect(lambda action, obj=p: self._handle_card_action(action, obj))
-                card.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-                self.vbox.addWidget(card)
-            self.vbox.addStretch()
-    
-    def _handle_card_action(self, action: str, partner: Partner):
+            # Отпечаток снимается до запроса: запись между ними приведет
+            # к лишней перезагрузке в следующий раз, а не к устаревшему кэшу
+            fingerprint = db_fingerprint(session)
+            if fingerprint == known_fingerprint:
+                return None
+            cards = [card_from_rank(r) for r in rank_partners(session, **criteria)]
+            return CachedList(fingerprint, partner_type_choices(session), cards)
+
+    def refresh_sync(self):
+        """Синхронное обновление (для замеров и тестов)"""
+        self._generation += 1
+        criteria = self._criteria()
+        self._populate(self._load(criteria), criteria)
+
+    def _on_data_loaded(self, payload):
+        generation, criteria, future = payload
+        if generation != self._generation:
+            # Результат устарел: уже запущена более новая загрузка
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._clear()
+            show_message(self, QMessageBox.Icon.Critical, "Ошибка загрузки данных", str(exc))
+            return
+        data = future.result()
+        if data is None:
+            # База не менялась: показанный список актуален
+            return
+        self._populate(data, criteria)
+
+    def _check_data_version(self):
+        if self._watcher.changed():
+            self.revalidate()
+
+    def save_cache(self):
+        """Сохранение показанного списка для следующего запуска"""
+        if self._shown is None:
+            return
+        try:
+            save_cache(self._shown_criteria, self._shown)
+        except OSError as e:
+            log.warning("Не удалось сохранить кэш списка партнеров: %s", e)
+
+    def _update_type_filter(self, types: list[tuple[str, int]]):
+        if [self.type_filter_combo.itemData(i) for i in range(1, self.type_filter_combo.count())] \
+                == [type_id for _, type_id in types]:
+            return
+        current = self.type_filter_combo.currentData()
+        self.type_filter_combo.blockSignals(True)
+        self.type_filter_combo.clear()
+        self.type_filter_combo.addItem("Все типы", None)
+        for name, type_id in types:
+            self.type_filter_combo.addItem(name, type_id)
+        idx = self.type_filter_combo.findData(current)
+        self.type_filter_combo.setCurrentIndex(idx if idx >= 0 else 0)
+        self.type_filter_combo.blockSignals(False)
+
+    def _make_card(self, c) -> ClickableCard:
+        subtitle = [
+            f"Директор: {c.director or '—'}",
+            c.phone or "—",
+            f"Рейтинг: {c.rating or '—'}",
+        ]
+        title = f"{c.type_name} | {c.name}"
+        if c.rank is not None:
+            title = f"{c.rank}. {title}"
+        card = ClickableCard(title, subtitle, c.discount)
+        card.clicked.connect(lambda action, pid=c.partner_id: self._handle_card_action(action, pid))
+        card.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+        return card
+
+    @memory_stage("список партнеров: построение карточек")
+    def _populate(self, data: CachedList, criteria: dict):
+        """
+        Показ списка с применением только отличий: карточки с прежними
+        данными переиспользуются, создаются лишь новые и измененные.
+        """
+        self._update_type_filter(data.types)
+        old = self._cards
+        self._cards = {}
+        # Снимаем все элементы без удаления, затем добавляем в новом порядке
+        reused = set()
+        while self.vbox.count():
+            self.vbox.takeAt(0)
+        for c in data.cards:
+            prev = old.get(c.partner_id)
+            if prev is not None and prev[0] == c:
+                card = prev[1]
+                reused.add(c.partner_id)
+            else:
+                card = self._make_card(c)
+            self._cards[c.partner_id] = (c, card)
+            self.vbox.addWidget(card)
+        self.vbox.addStretch()
+        for partner_id, (_, card) in old.items():
+            if partner_id not in reused:
+                card.deleteLater()
+        for skeleton in self.container.findChildren(SkeletonCard):
+            skeleton.deleteLater()
+
+        self._shown = data
+        self._shown_criteria = criteria
+        self.data_visible.emit()
+
+    def _handle_card_action(self, action: str, partner_id: int):
+        with Session(ENGINE) as session:
+            partner = session.get(Partner, partner_id, options=[joinedload(Partner.partner_type)])
+        if partner is None:
+            # Партнер удален после построения списка
+            self.revalidate()
+            return
         if action == "edit":
             self.open_form_cb(partner)
         elif action == "history":
             self.open_history_cb(partner)
 
 
-EMAIL_RE = re.compile(r"^[\w\.-]+@[\w\.-]+\.[A-Za-z]{2,}$")
-PHONE_RE = re.compile(r"^[\d\s\-\+\(\)]+$")
+def _save_partner(session: Session, partner_id: Optional[int], values: dict) -> int:
+    """Задание для потока-писателя: создание или обновление партнёра"""
+    if partner_id is None:
+        partner = Partner()
+        session.add(partner)
+    else:
+        partner = session.get(Partner, partner_id)
+        if partner is None:
+            raise ValueError(f"Партнёр {partner_id} не найден")
+    for key, value in values.items():
+        setattr(partner, key, value)
+    session.flush()
+    return partner.id
 
 
 class PartnerFormPage(QWidget):
+    save_finished = Signal(object)  # Future задания записи
+
     def __init__(self, back_cb, refresh_cb, parent=None):
         super().__init__(parent)
         self._back = back_cb
         self._refresh = refresh_cb
         self.partner: Optional[Partner] = None
+        self.save_finished.connect(self._on_save_finished)
         self._build_ui()
 
     def _build_ui(self):
@@ -276,14 +551,14 @@ class PartnerFormPage(QWidget):
 
         # buttons
         btn_row = QHBoxLayout()
-        save_btn = QPushButton("Сохранить")
+        self.save_btn = QPushButton("Сохранить")
         back_btn = QPushButton("Назад")
-        btn_row.addWidget(save_btn)
+        btn_row.addWidget(self.save_btn)
         btn_row.addStretch()
         btn_row.addWidget(back_btn)
         layout.addLayout(btn_row)
 
-        save_btn.clicked.connect(self._on_save)
+        self.save_btn.clicked.connect(self._on_save)
         back_btn.clicked.connect(self._back)
 
     def _load_types(self):
@@ -327,26 +602,30 @@ class PartnerFormPage(QWidget):
         if phone and not PHONE_RE.match(phone):
             show_message(self, QMessageBox.Icon.Critical, "Ошибка", "Телефон содержит недопустимые символы")
             return
-        try:
-            with Session(ENGINE) as session:
-                if self.partner is None:
-                    partner = Partner()
-                    session.add(partner)
-                else:
-                    partner = session.get(Partner, self.partner.id)
-                partner.name = name
-                partner.partner_type_id = self.type_combo.currentData()
-                partner.rating = self.rating_spin.value()
-                partner.legal_address = self.addr_edit.text().strip()
-                partner.director = self.dir_edit.text().strip()
-                partner.phone = phone
-                partner.email = email
-                session.commit()
-            show_message(self, QMessageBox.Icon.Information, "Успех", "Данные сохранены")
-            self._refresh()
-            self._back()
-        except SQLAlchemyError as exc:
+        values = dict(
+            name=name,
+            partner_type_id=self.type_combo.currentData(),
+            rating=self.rating_spin.value(),
+            legal_address=self.addr_edit.text().strip(),
+            director=self.dir_edit.text().strip(),
+            phone=phone,
+            email=email,
+        )
+        partner_id = self.partner.id if self.partner is not None else None
+        # Запись выполняется потоком-писателем, результат приходит сигналом
+        self.save_btn.setEnabled(False)
+        future = get_writer().submit(_save_partner, partner_id, values)
+        future.add_done_callback(self.save_finished.emit)
+
+    def _on_save_finished(self, future):
+        self.save_btn.setEnabled(True)
+        exc = future.exception()
+        if exc is not None:
             show_message(self, QMessageBox.Icon.Critical, "Ошибка сохранения", str(exc))
+            return
+        show_message(self, QMessageBox.Icon.Information, "Успех", "Данные сохранены")
+        self._refresh()
+        self._back()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -405,9 +684,11 @@ class MainWindow(QMainWindow):
         # Кнопки меню
         self.btn_partners = SideMenuButton("Партнеры")
         self.btn_materials = SideMenuButton("Расчет материалов")
+        self.btn_demand = SideMenuButton("Спрос по продукции")
         
         left_layout.addWidget(self.btn_partners)
         left_layout.addWidget(self.btn_materials)
+        left_layout.addWidget(self.btn_demand)
         left_layout.addStretch()
         
         # ----- Правая панель с содержимым -----
@@ -420,59 +701,111 @@ class MainWindow(QMainWindow):
         self.stacked = QStackedWidget()
         right_layout.addWidget(self.stacked)
         
-        # Создаем страницы
-        self.list_page = PartnerListPage(self._open_form, self._open_history)
-        self.form_page = PartnerFormPage(self._back_to_list, self._refresh_list)
-        self.history_page = PartnerProductHistoryPage(self._back_to_list)
-        self.calculator_page = MaterialCalculatorPage()
-        
-        # Добавляем страницы в стек
-        self.stacked.addWidget(self.list_page)      # index 0 - список партнеров
-        self.stacked.addWidget(self.form_page)      # index 1 - форма партнера
-        self.stacked.addWidget(self.history_page)   # index 2 - история продукции
-        self.stacked.addWidget(self.calculator_page) # index 3 - калькулятор материалов
+        # Страницы создаются при первом переходе на них
+        self._pages: dict[str, QWidget] = {}
+        self._page_factories = {
+            "list": lambda: PartnerListPage(self._open_form, self._open_history),
+            "form": lambda: PartnerFormPage(self._back_to_list, self._refresh_list),
+            "history": lambda: PartnerProductHistoryPage(self._back_to_list),
+            "calculator": MaterialCalculatorPage,
+            "demand": ProductDemandPage,
+        }
         
         # Соединяем сигналы кнопок меню
-        self.btn_partners.clicked.connect(lambda: self._switch_page(0))
-        self.btn_materials.clicked.connect(lambda: self._switch_page(3))
+        self.btn_partners.clicked.connect(lambda: self._switch_page("list"))
+        self.btn_materials.clicked.connect(lambda: self._switch_page("calculator"))
+        self.btn_demand.clicked.connect(lambda: self._switch_page("demand"))
         
         # Добавляем панели в главный контейнер
         main_layout.addWidget(left_panel)
         main_layout.addWidget(right_panel)
         
         # Устанавливаем начальную страницу
-        self._switch_page(0)
+        self._switch_page("list")
+        self.list_page.data_visible.connect(self._on_first_data_visible)
+
+    def _page(self, key: str) -> QWidget:
+        page = self._pages.get(key)
+        if page is None:
+            page = self._page_factories[key]()
+            self._pages[key] = page
+            self.stacked.addWidget(page)
+        return page
+
+    @property
+    def list_page(self) -> PartnerListPage:
+        return self._page("list")
+
+    @property
+    def form_page(self) -> PartnerFormPage:
+        return self._page("form")
+
+    @property
+    def history_page(self) -> PartnerProductHistoryPage:
+        return self._page("history")
+
+    @property
+    def calculator_page(self) -> MaterialCalculatorPage:
+        return self._page("calculator")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not getattr(self, "_shown_logged", False):
+            self._shown_logged = True
+            log.info("Окно показано через %.0f мс", (time.perf_counter() - _STARTED_AT) * 1000)
+
+    def _on_first_data_visible(self):
+        self.list_page.data_visible.disconnect(self._on_first_data_visible)
+        log.info("Данные видны через %.0f мс", (time.perf_counter() - _STARTED_AT) * 1000)
+
+    def closeEvent(self, event):
+        if "list" in self._pages:
+            self.list_page.save_cache()
+        super().closeEvent(event)
 
     def _refresh_list(self):
-        self.list_page.refresh()
+        if "list" in self._pages:
+            self.list_page.refresh()
 
     def _open_form(self, partner: Optional[Partner]):
         self.form_page.load_partner(partner)
-        self.stacked.setCurrentIndex(1)
+        self.stacked.setCurrentWidget(self.form_page)
 
     def _open_history(self, partner: Partner):
         self.history_page.load_partner_history(partner)
-        self.stacked.setCurrentIndex(2)
+        self.stacked.setCurrentWidget(self.history_page)
 
     def _back_to_list(self):
-        self.stacked.setCurrentIndex(0)
-        self._switch_page(0)  # Переключаем и меню
+        self._switch_page("list")  # Переключаем и меню
     
-    def _switch_page(self, index: int):
+    def _switch_page(self, key: str):
         """Переключение между основными страницами"""
-        self.stacked.setCurrentIndex(index)
+        self.stacked.setCurrentWidget(self._page(key))
         
         # Обновляем состояние кнопок меню
-        self.btn_partners.setChecked(index == 0)
-        self.btn_materials.setChecked(index == 3)
+        self.btn_partners.setChecked(key == "list")
+        self.btn_materials.setChecked(key == "calculator")
+        self.btn_demand.setChecked(key == "demand")
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    # Базы, созданные прежними версиями, дополняются таблицей спецификаций
+    # и индексом продаж; в больших базах построение индекса занимает секунды
+    ensure_bom_table()
+    if ensure_indexes(DB_PATH):
+        log.info("Индексы продаж созданы")
+    # Пока блокировка держится, архивирование и перевод схемы продаж не запускаются
+    app_lock = hold_app_lock(DB_PATH)
+    if os.environ.get("APP_DB_REPLICA") == "1":
+        enable_read_replica(DB_PATH, ENGINE, get_writer())
     app = QApplication(sys.argv)
     app.setFont(QFont("Segoe UI"))
     win = MainWindow()
     win.resize(1200, 750)
     win.show()
-    sys.exit(app.exec())
+    code = app.exec()
+    app_lock.close()
+    sys.exit(code)
 
 
 if __name__ == "__main__":
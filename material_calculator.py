@@ -4,10 +4,45 @@ material_calculator.py — модуль расчета материалов
 
 Функции:
 * Расчет количества материала для производства продукции с учетом брака
+* Расчет материалов для продукции по ее спецификации (BOM)
+* Кэш результатов расчета с вытеснением давно не использованных (LRU)
 """
 import math
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, true
 from sqlalchemy.orm import Session
-from DB_prepare import ENGINE, ProductType, MaterialType
+from DB_prepare import (ENGINE, Product, ProductType, MaterialType, ProductMaterial,
+                        watch_model_changes)
+
+# Коэффициент типа продукции и процент брака материала одним запросом;
+# если хотя бы один из типов не найден, строк нет
+COEFFICIENTS_STMT = (
+    select(ProductType.coefficient, MaterialType.defect_percentage)
+    .join(MaterialType, true())
+    .where(
+        ProductType.id == bindparam("product_type_id"),
+        MaterialType.id == bindparam("material_type_id"),
+    )
+)
+
+# Спецификация продукции с коэффициентом ее типа и процентом брака материалов
+BOM_STMT = (
+    select(ProductMaterial.material_type_id,
+           ProductMaterial.param1,
+           ProductMaterial.param2,
+           ProductType.coefficient,
+           MaterialType.defect_percentage)
+    .join(Product, Product.id == ProductMaterial.product_id)
+    .join(ProductType, ProductType.id == Product.product_type_id)
+    .join(MaterialType, MaterialType.id == ProductMaterial.material_type_id)
+    .where(ProductMaterial.product_id == bindparam("product_id"))
+)
+
+# Ключ кэша: (product_type_id, material_type_id, quantity, param1, param2)
+CalculationKey = Tuple[int, int, int, float, float]
 
 
 def calculate_material_quantity(
@@ -37,21 +72,19 @@ def calculate_material_quantity(
     
     try:
         with Session(ENGINE) as session:
-            # Получаем тип продукции
-            product_type = session.query(ProductType).get(product_type_id)
-            if not product_type:
-                return -1
-            
-            # Получаем тип материала
-            material_type = session.query(MaterialType).get(material_type_id)
-            if not material_type:
+            # Получаем коэффициент типа продукции и процент брака материала
+            row = session.execute(
+                COEFFICIENTS_STMT,
+                {"product_type_id": product_type_id, "material_type_id": material_type_id},
+            ).first()
+            if row is None:
                 return -1
             
             # Коэффициент типа продукции
-            coefficient = float(product_type.coefficient)
+            coefficient = float(row.coefficient)
             
             # Процент брака материала
-            defect_percentage = float(material_type.defect_percentage)
+            defect_percentage = float(row.defect_percentage)
             
             # Расчет количества материала на единицу продукции
             material_per_unit = param1 * param2 * coefficient
@@ -66,4 +99,110 @@ def calculate_material_quantity(
             return math.ceil(total_with_defect)
             
     except Exception:
-        return -1
\ No newline at end of file
+        return -1
+
+
+def calculate_product_materials(product_id: int, quantity: int) -> dict[int, int]:
+    """
+    Расчет материалов для продукции по сохраненной спецификации.
+
+    Аргументы:
+        product_id: Идентификатор продукции
+        quantity: Количество продукции
+
+    Возвращает:
+        Словарь {идентификатор типа материала: количество с учетом брака};
+        пустой словарь, если спецификации нет или количество некорректно
+    """
+    if quantity <= 0:
+        return {}
+
+    with Session(ENGINE) as session:
+        rows = session.execute(BOM_STMT, {"product_id": product_id}).all()
+    # Коэффициент берется из типа продукции при каждом расчете
+    return {
+        material_type_id: math.ceil(
+            float(param1) * float(param2) * float(coefficient) * quantity
+            * (1 + float(defect or 0) / 100)
+        )
+        for material_type_id, param1, param2, coefficient, defect in rows
+    }
+
+
+class CalculationCache:
+    """
+    Ограниченный по размеру кэш результатов calculate_material_quantity.
+
+    При переполнении вытесняется запись, к которой дольше всего не обращались.
+    Ведется статистика попаданий.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[CalculationKey, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: CalculationKey) -> Optional[int]:
+        with self._lock:
+            result = self._data.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: CalculationKey, result: int):
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def recent(self, limit: Optional[int] = None) -> List[Tuple[CalculationKey, int]]:
+        """Записи кэша, начиная с последней использованной"""
+        with self._lock:
+            items = list(reversed(self._data.items()))
+        return items[:limit] if limit is not None else items
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._data)
+
+
+calculation_cache = CalculationCache()
+
+# Изменение коэффициентов или процентов брака сбрасывает кэш
+watch_model_changes((ProductType, MaterialType), calculation_cache.clear, "calculation_cache_dirty")
+
+
+def calculate_material_quantity_cached(
+    product_type_id: int,
+    material_type_id: int,
+    quantity: int,
+    param1: float,
+    param2: float
+) -> int:
+    """
+    То же, что calculate_material_quantity, но с кэшированием результата.
+
+    Ошибочные результаты (-1) не кэшируются.
+    """
+    key = (product_type_id, material_type_id, quantity, param1, param2)
+    result = calculation_cache.get(key)
+    if result is not None:
+        return result
+    result = calculate_material_quantity(*key)
+    if result != -1:
+        calculation_cache.put(key, result)
+    return result
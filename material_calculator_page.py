@@ -14,11 +14,19 @@ from PySide6.QtWidgets import (
     QGroupBox,
     QFormLayout,
     QMessageBox,
+    QListWidget,
+    QListWidgetItem,
+    QTabWidget,
 )
 from sqlalchemy.orm import Session
 
 from DB_prepare import ENGINE, ProductType, MaterialType
-from material_calculator import calculate_material_quantity
+from material_calculator import calculate_material_quantity_cached, calculation_cache
+from material_sweep_page import MaterialSweepWidget
+from product_bom_page import ProductMaterialsWidget
+
+# Сколько последних расчетов показывать в панели
+RECENT_LIMIT = 10
 
 
 class MaterialCalculatorPage(QWidget):
@@ -26,11 +34,12 @@ class MaterialCalculatorPage(QWidget):
         super().__init__(parent)
         self._build_ui()
         self._load_data()
+        self._refresh_recent()
 
     def _build_ui(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(24, 24, 24, 24)
-        layout.setSpacing(12)
+        outer = QVBoxLayout(self)
+        outer.setContentsMargins(24, 24, 24, 24)
+        outer.setSpacing(12)
 
         # Заголовок
         title_lbl = QLabel("Расчет количества материала")
@@ -38,7 +47,20 @@ class MaterialCalculatorPage(QWidget):
         f.setPointSize(12)
         f.setBold(True)
         title_lbl.setFont(f)
-        layout.addWidget(title_lbl)
+        outer.addWidget(title_lbl)
+
+        # Вкладки: расчет по спецификации, одиночный расчет по параметрам
+        # и перебор параметров
+        tabs = QTabWidget()
+        outer.addWidget(tabs)
+        self.bom_widget = ProductMaterialsWidget()
+        tabs.addTab(self.bom_widget, "По спецификации")
+        single_tab = QWidget()
+        layout = QVBoxLayout(single_tab)
+        layout.setSpacing(12)
+        tabs.addTab(single_tab, "Расчет по параметрам")
+        self.sweep_widget = MaterialSweepWidget()
+        tabs.addTab(self.sweep_widget, "Перебор параметров")
 
         # Группа для ввода параметров
         params_group = QGroupBox("Параметры расчета")
@@ -91,6 +113,18 @@ class MaterialCalculatorPage(QWidget):
         
         layout.addWidget(result_group)
         
+        # Недавние расчеты (строятся из кэша, без обращения к базе)
+        recent_group = QGroupBox("Недавние расчеты")
+        recent_layout = QVBoxLayout(recent_group)
+        self.recent_list = QListWidget()
+        self.recent_list.setMaximumHeight(160)
+        self.recent_list.itemClicked.connect(self._on_recent_clicked)
+        recent_layout.addWidget(self.recent_list)
+        self.cache_stats_label = QLabel()
+        self.cache_stats_label.setStyleSheet("color: #666;")
+        recent_layout.addWidget(self.cache_stats_label)
+        layout.addWidget(recent_group)
+
         # Дополнительная информация о коэффициентах
         info_label = QLabel("* При расчете учитывается коэффициент типа продукции и процент брака материала")
         info_label.setStyleSheet("color: #666;")
@@ -142,22 +176,26 @@ class MaterialCalculatorPage(QWidget):
             
         product_type_id, material_type_id, quantity, param1, param2 = inputs
         
-        result = calculate_material_quantity(
+        result = calculate_material_quantity_cached(
             product_type_id=product_type_id,
             material_type_id=material_type_id,
             quantity=quantity,
             param1=param1,
             param2=param2
         )
-        
+        self._show_result(inputs, result)
+        self._refresh_recent()
+
+    def _show_result(self, inputs, result: int):
+        """Отображение результата расчета"""
+        product_type_id, material_type_id, quantity, param1, param2 = inputs
         if result == -1:
             self.result_label.setText(
                 "<span style='color: red;'>Невозможно выполнить расчет. "
                 "Проверьте входные данные или наличие выбранных типов в системе.</span>"
             )
         else:
-            product_type_name = self.product_type_combo.currentText()
-            material_type_name = self.material_type_combo.currentText().split(" (")[0]
+            product_type_name, material_type_name = self._type_names(product_type_id, material_type_id)
             
             self.result_label.setText(
                 f"<div style='text-align: center;'>"
@@ -167,3 +205,41 @@ class MaterialCalculatorPage(QWidget):
                 f"<p>(с учетом параметров продукции {param1} × {param2} и возможного брака)</p>"
                 f"</div>"
             )
+
+    def _type_names(self, product_type_id: int, material_type_id: int) -> Tuple[str, str]:
+        """Названия типов по данным комбобоксов"""
+        product_type_name = self.product_type_combo.itemText(
+            self.product_type_combo.findData(product_type_id))
+        material_type_name = self.material_type_combo.itemText(
+            self.material_type_combo.findData(material_type_id)).split(" (")[0]
+        return product_type_name, material_type_name
+
+    def _refresh_recent(self):
+        """Перестроение панели недавних расчетов из кэша"""
+        self.recent_list.clear()
+        for key, result in calculation_cache.recent(RECENT_LIMIT):
+            product_type_id, material_type_id, quantity, param1, param2 = key
+            product_type_name, material_type_name = self._type_names(product_type_id, material_type_id)
+            item = QListWidgetItem(
+                f"{product_type_name}, {material_type_name}: "
+                f"{quantity} ед., {param1} × {param2} → {result} ед."
+            )
+            item.setData(Qt.ItemDataRole.UserRole, (key, result))
+            self.recent_list.addItem(item)
+        self.cache_stats_label.setText(
+            f"Кэш: {len(calculation_cache)} записей, "
+            f"попаданий {calculation_cache.hits} из "
+            f"{calculation_cache.hits + calculation_cache.misses} "
+            f"({calculation_cache.hit_rate:.0%})"
+        )
+
+    def _on_recent_clicked(self, item: QListWidgetItem):
+        """Повтор недавнего расчета: поля заполняются, результат берется из кэша"""
+        key, result = item.data(Qt.ItemDataRole.UserRole)
+        product_type_id, material_type_id, quantity, param1, param2 = key
+        self.product_type_combo.setCurrentIndex(self.product_type_combo.findData(product_type_id))
+        self.material_type_combo.setCurrentIndex(self.material_type_combo.findData(material_type_id))
+        self.quantity_spin.setValue(quantity)
+        self.param1_edit.setText(str(param1))
+        self.param2_edit.setText(str(param2))
+        self._show_result(key, result)
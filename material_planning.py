@@ -0,0 +1,239 @@
+"""
+material_planning.py — планирование потребности в материалах
+-----------------------------------------------------------
+
+Функции:
+* Ведение спецификации продукции (связь продукции с материалом и параметрами),
+  загрузка спецификации из Excel
+* Расчет потребности в материалах по истории продаж одним SQL-запросом
+  (группировка по материалу и месяцу)
+* Кэширование результата со сбросом при изменении спецификации или продаж
+
+Загрузка спецификации: python material_planning.py <файл.xlsx>
+"""
+from __future__ import annotations
+
+import math
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from DB_prepare import (ENGINE, MaterialType, PartnerProduct, Product,
+                        ProductMaterial, ProductType, watch_model_changes)
+
+
+class MaterialDemand(NamedTuple):
+    material_type_id: int
+    material_name: str
+    month: Optional[str]  # "ГГГГ-ММ", None для продаж без даты
+    quantity: int
+
+
+# Коэффициент типа продукции входит в расход и берется при расчете,
+# поэтому его изменение тоже сбрасывает кэш
+_WATCHED = (ProductMaterial, PartnerProduct, MaterialType, ProductType)
+
+BOM_COLUMNS = ("Продукция", "Тип материала", "Параметр продукции 1", "Параметр продукции 2")
+
+_cache: Optional[List[MaterialDemand]] = None
+_generation = 0
+_cache_lock = threading.Lock()
+
+
+def invalidate_demand_cache():
+    """Сброс кэша потребности в материалах"""
+    global _cache, _generation
+    with _cache_lock:
+        _cache = None
+        _generation += 1
+
+
+# Изменение спецификации, продаж, коэффициента или процента брака через ORM сбрасывает кэш
+watch_model_changes(_WATCHED, invalidate_demand_cache, "material_demand_dirty")
+
+
+def ensure_bom_table(engine: Engine = ENGINE):
+    """Создание таблицы спецификаций в базе, созданной до ее появления"""
+    ProductMaterial.__table__.create(engine, checkfirst=True)
+
+
+def set_product_material(
+    session: Session,
+    product_id: int,
+    material_type_id: int,
+    param1: float,
+    param2: float,
+) -> ProductMaterial:
+    """
+    Создание или обновление строки спецификации продукции.
+
+    Функцию удобно передавать в поток записи: get_writer().submit(set_product_material, ...)
+
+    Аргументы:
+        session: Сессия SQLAlchemy
+        product_id: Идентификатор продукции
+        material_type_id: Идентификатор типа материала
+        param1: Параметр продукции 1 (вещественное положительное число)
+        param2: Параметр продукции 2 (вещественное положительное число)
+
+    Возвращает:
+        Строку спецификации
+    """
+    if param1 <= 0 or param2 <= 0:
+        raise ValueError("Параметры продукции должны быть положительными числами")
+    if session.get(Product, product_id) is None:
+        raise ValueError(f"Продукция {product_id} не найдена")
+    if session.get(MaterialType, material_type_id) is None:
+        raise ValueError(f"Тип материала {material_type_id} не найден")
+
+    bom = (
+        session.query(ProductMaterial)
+        .filter_by(product_id=product_id, material_type_id=material_type_id)
+        .one_or_none()
+    )
+    if bom is None:
+        bom = ProductMaterial(product_id=product_id, material_type_id=material_type_id)
+        session.add(bom)
+    bom.param1 = param1
+    bom.param2 = param2
+    session.flush()
+    return bom
+
+
+def delete_product_material(session: Session, product_id: int, material_type_id: int) -> bool:
+    """
+    Удаление материала из спецификации продукции.
+
+    Аргументы:
+        session: Сессия SQLAlchemy
+        product_id: Идентификатор продукции
+        material_type_id: Идентификатор типа материала
+
+    Возвращает:
+        True, если строка была удалена
+    """
+    bom = (
+        session.query(ProductMaterial)
+        .filter_by(product_id=product_id, material_type_id=material_type_id)
+        .one_or_none()
+    )
+    if bom is None:
+        return False
+    session.delete(bom)
+    session.flush()
+    return True
+
+
+def import_bom(session: Session, path: Path) -> int:
+    """
+    Загрузка спецификации из книги Excel со столбцами BOM_COLUMNS.
+
+    Продукция и типы материалов сопоставляются по наименованию;
+    существующие строки спецификации обновляются.
+
+    Аргументы:
+        session: Сессия SQLAlchemy
+        path: Путь к файлу Excel
+
+    Возвращает:
+        Количество загруженных строк
+    """
+    df = pd.read_excel(path)
+    missing = [c for c in BOM_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"В файле нет столбцов: {', '.join(missing)}")
+    products = dict(session.query(Product.name, Product.id).all())
+    materials = dict(session.query(MaterialType.name, MaterialType.id).all())
+    rows = df[list(BOM_COLUMNS)].itertuples(index=False, name=None)
+    for product_name, material_name, param1, param2 in rows:
+        if product_name not in products:
+            raise ValueError(f"Продукция не найдена: {product_name}")
+        if material_name not in materials:
+            raise ValueError(f"Тип материала не найден: {material_name}")
+        set_product_material(session, products[product_name], materials[material_name],
+                             float(param1), float(param2))
+    return len(df)
+
+
+def compute_material_demand(session: Session) -> List[MaterialDemand]:
+    """
+    Расчет потребности в материалах по всем продажам.
+
+    Продажи соединяются со спецификацией, продукцией, типами продукции
+    и материалов в одном запросе; расход на единицу (param1 * param2 *
+    коэффициент) считается там же, суммирование идет на стороне базы,
+    группы — материал и месяц.
+    Результат округляется вверх, как в calculate_material_quantity.
+
+    Аргументы:
+        session: Сессия SQLAlchemy
+
+    Возвращает:
+        Список MaterialDemand, упорядоченный по материалу и месяцу
+    """
+    month = func.strftime("%Y-%m", PartnerProduct.sale_date).label("month")
+    demand = func.sum(
+        PartnerProduct.quantity
+        * ProductMaterial.param1
+        * ProductMaterial.param2
+        * ProductType.coefficient
+        * (1 + func.coalesce(MaterialType.defect_percentage, 0) / 100.0)
+    )
+    rows = (
+        session.query(MaterialType.id, MaterialType.name, month, demand)
+        .select_from(PartnerProduct)
+        .join(ProductMaterial, ProductMaterial.product_id == PartnerProduct.product_id)
+        .join(Product, Product.id == PartnerProduct.product_id)
+        .join(ProductType, ProductType.id == Product.product_type_id)
+        .join(MaterialType, MaterialType.id == ProductMaterial.material_type_id)
+        .group_by(MaterialType.id, month)
+        .order_by(MaterialType.name, month)
+        .all()
+    )
+    return [
+        MaterialDemand(mt_id, name, m, math.ceil(total or 0))
+        for mt_id, name, m, total in rows
+    ]
+
+
+def get_material_demand() -> List[MaterialDemand]:
+    """
+    Потребность в материалах с кэшированием.
+
+    Возвращает:
+        Список MaterialDemand (см. compute_material_demand)
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        generation = _generation
+    with Session(ENGINE) as session:
+        result = compute_material_demand(session)
+    with _cache_lock:
+        if generation == _generation:
+            _cache = result
+    return result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Загрузка спецификации продукции из Excel")
+    parser.add_argument("path", type=Path,
+                        help=f"книга Excel со столбцами: {', '.join(BOM_COLUMNS)}")
+    args = parser.parse_args()
+    ensure_bom_table()
+    with Session(ENGINE) as session:
+        count = import_bom(session, args.path)
+        session.commit()
+    print(f"Загружено строк спецификации: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+material_sweep.py — перебор параметров расчета материала
+-------------------------------------------------------
+
+Функции:
+* Кэш справочных данных для расчета (коэффициенты типов продукции,
+  проценты брака материалов) со сбросом при их изменении
+* Расчет количества материала для всей сетки
+  (материал × количество × параметр 1 × параметр 2) одной операцией NumPy
+* Определение материала с наименьшим расходом для каждой точки сетки
+"""
+from __future__ import annotations
+
+import threading
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from DB_prepare import ENGINE, MaterialType, ProductType, watch_model_changes
+
+
+class ReferenceData(NamedTuple):
+    product_types: List[tuple]   # (id, наименование, коэффициент)
+    material_types: List[tuple]  # (id, наименование, процент брака)
+
+
+class SweepResult(NamedTuple):
+    material_type_ids: np.ndarray  # (M,)
+    quantities: np.ndarray         # (Q,)
+    param1: np.ndarray             # (P1,)
+    param2: np.ndarray             # (P2,)
+    amounts: np.ndarray            # (M, Q, P1, P2), целые значения в float64
+    cheapest: np.ndarray           # (Q, P1, P2), индекс материала по оси M
+
+
+_reference: Optional[ReferenceData] = None
+_reference_lock = threading.Lock()
+
+
+def invalidate_reference():
+    """Сброс кэша справочных данных"""
+    global _reference
+    with _reference_lock:
+        _reference = None
+
+
+watch_model_changes((ProductType, MaterialType), invalidate_reference, "sweep_reference_dirty")
+
+
+def get_reference() -> ReferenceData:
+    """Справочные данные для расчета; из базы читаются только при пустом кэше"""
+    global _reference
+    with _reference_lock:
+        if _reference is not None:
+            return _reference
+    with Session(ENGINE) as session:
+        product_types = [
+            (pt_id, name, float(coef))
+            for pt_id, name, coef in session.execute(
+                select(ProductType.id, ProductType.name, ProductType.coefficient)
+                .order_by(ProductType.name)
+            )
+        ]
+        material_types = [
+            (mt_id, name, float(defect or 0))
+            for mt_id, name, defect in session.execute(
+                select(MaterialType.id, MaterialType.name, MaterialType.defect_percentage)
+                .order_by(MaterialType.name)
+            )
+        ]
+    reference = ReferenceData(product_types, material_types)
+    with _reference_lock:
+        _reference = reference
+    return reference
+
+
+def sweep_material_quantity(
+    coefficient: float,
+    defect_percentages,
+    quantities,
+    param1,
+    param2,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Расчет количества материала для всех сочетаний входных значений.
+
+    Порядок операций тот же, что в calculate_material_quantity, поэтому
+    значения в каждой точке совпадают с поштучным расчетом.
+
+    Аргументы:
+        coefficient: Коэффициент типа продукции
+        defect_percentages: Проценты брака материалов, форма (M,)
+        quantities: Количества продукции, форма (Q,)
+        param1: Значения параметра 1, форма (P1,)
+        param2: Значения параметра 2, форма (P2,)
+
+    Возвращает:
+        Кортеж (количества материала формы (M, Q, P1, P2),
+        индекс материала с наименьшим расходом формы (Q, P1, P2))
+    """
+    defect = np.asarray(defect_percentages, dtype=np.float64)
+    qty = np.asarray(quantities, dtype=np.float64)
+    p1 = np.asarray(param1, dtype=np.float64)
+    p2 = np.asarray(param2, dtype=np.float64)
+
+    # Расход на единицу продукции: (P1, P2)
+    per_unit = np.multiply.outer(p1, p2)
+    per_unit *= coefficient
+    # Без учета брака: (Q, P1, P2)
+    total = per_unit[None, :, :] * qty[:, None, None]
+    # С учетом брака: (M, Q, P1, P2), результат пишется в один массив
+    amounts = total[None, :, :, :] * (1 + defect / 100)[:, None, None, None]
+    np.ceil(amounts, out=amounts)
+    return amounts, amounts.argmin(axis=0)
+
+
+def run_sweep(
+    product_type_id: int,
+    material_type_ids: List[int],
+    quantities,
+    param1,
+    param2,
+) -> SweepResult:
+    """
+    Перебор для выбранного типа продукции и набора материалов
+    по кэшированным справочным данным. Если тип продукции или материала
+    не найден в справочнике, выбрасывается ValueError.
+    """
+    reference = get_reference()
+    coefficient = next((coef for pt_id, _, coef in reference.product_types
+                        if pt_id == product_type_id), None)
+    if coefficient is None:
+        raise ValueError("Тип продукции не найден")
+    defects = {mt_id: defect for mt_id, _, defect in reference.material_types}
+    missing = [mt_id for mt_id in material_type_ids if mt_id not in defects]
+    if missing:
+        raise ValueError(f"Типы материала не найдены: {missing}")
+    amounts, cheapest = sweep_material_quantity(
+        coefficient, [defects[mt_id] for mt_id in material_type_ids],
+        quantities, param1, param2,
+    )
+    return SweepResult(
+        np.asarray(material_type_ids), np.asarray(quantities),
+        np.asarray(param1), np.asarray(param2), amounts, cheapest,
+    )
@@ -0,0 +1,241 @@
+from __future__ import annotations
+import time
+from typing import Optional
+
+import numpy as np
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor, QDoubleValidator
+from PySide6.QtWidgets import (
+    QLabel,
+    QVBoxLayout,
+    QHBoxLayout,
+    QWidget,
+    QPushButton,
+    QComboBox,
+    QSpinBox,
+    QLineEdit,
+    QGroupBox,
+    QFormLayout,
+    QMessageBox,
+    QListWidget,
+    QListWidgetItem,
+    QTableView,
+    QHeaderView,
+)
+
+from material_sweep import SweepResult, get_reference, run_sweep
+
+# Ограничение размера сетки (точек на материал), чтобы не исчерпать память
+MAX_GRID_POINTS = 5_000_000
+
+CHEAPEST_COLOR = QColor("#d6f5d6")
+
+
+class SweepTableModel(QAbstractTableModel):
+    """
+    Модель таблицы результатов перебора.
+
+    Строка — сочетание (количество, параметр 1, параметр 2), столбцы —
+    материалы. Ячейки вычисляются из массивов при отрисовке, поэтому
+    таблица на миллионы строк не создает объектов на каждую ячейку.
+    """
+
+    FIXED_COLUMNS = ("Количество", "Параметр 1", "Параметр 2")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._result: Optional[SweepResult] = None
+        self._material_names: list[str] = []
+        self._shape = (0, 0, 0)
+
+    def set_result(self, result: SweepResult, material_names: list[str]):
+        self.beginResetModel()
+        self._result = result
+        self._material_names = material_names
+        self._shape = result.cheapest.shape
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._result is None:
+            return 0
+        q, p1, p2 = self._shape
+        return q * p1 * p2
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.FIXED_COLUMNS) + len(self._material_names)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or orientation != Qt.Orientation.Horizontal:
+            return None
+        if section < len(self.FIXED_COLUMNS):
+            return self.FIXED_COLUMNS[section]
+        return self._material_names[section - len(self.FIXED_COLUMNS)]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self._result is None:
+            return None
+        r = self._result
+        q, i, j = np.unravel_index(index.row(), self._shape)
+        col = index.column()
+        m = col - len(self.FIXED_COLUMNS)
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return str(int(r.quantities[q]))
+            if col == 1:
+                return f"{r.param1[i]:g}"
+            if col == 2:
+                return f"{r.param2[j]:g}"
+            return str(int(r.amounts[m, q, i, j]))
+        if role == Qt.ItemDataRole.BackgroundRole and m >= 0:
+            if r.cheapest[q, i, j] == m:
+                return CHEAPEST_COLOR
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+
+class MaterialSweepWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._build_ui()
+        self._load_data()
+
+    def _range_row(self, start: str, stop: str, decimals: int = 2):
+        """Поля "от", "до", "точек" для одного параметра"""
+        row = QHBoxLayout()
+        start_edit = QLineEdit(start)
+        stop_edit = QLineEdit(stop)
+        if decimals:
+            validator = QDoubleValidator(0.01, 10000.0, decimals)
+        else:
+            validator = QDoubleValidator(1, 1_000_000, 0)
+        start_edit.setValidator(validator)
+        stop_edit.setValidator(validator)
+        count_spin = QSpinBox()
+        count_spin.setRange(1, 10000)
+        count_spin.setValue(10)
+        for text, w in (("от", start_edit), ("до", stop_edit), ("точек", count_spin)):
+            row.addWidget(QLabel(text))
+            row.addWidget(w)
+        return row, (start_edit, stop_edit, count_spin)
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        params_group = QGroupBox("Диапазоны перебора")
+        form_layout = QFormLayout(params_group)
+        form_layout.setSpacing(10)
+
+        self.product_type_combo = QComboBox()
+        form_layout.addRow("Тип продукции:", self.product_type_combo)
+
+        row, self.quantity_range = self._range_row("1", "100", decimals=0)
+        self.quantity_range[2].setValue(1)
+        form_layout.addRow("Количество продукции:", row)
+        row, self.param1_range = self._range_row("1.0", "10.0")
+        form_layout.addRow("Параметр продукции 1:", row)
+        row, self.param2_range = self._range_row("1.0", "10.0")
+        form_layout.addRow("Параметр продукции 2:", row)
+
+        self.material_list = QListWidget()
+        self.material_list.setMaximumHeight(110)
+        form_layout.addRow("Типы материала:", self.material_list)
+        layout.addWidget(params_group)
+
+        btn_row = QHBoxLayout()
+        run_btn = QPushButton("Рассчитать перебор")
+        run_btn.setMinimumHeight(40)
+        run_btn.clicked.connect(self._run)
+        btn_row.addWidget(run_btn)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #666;")
+        btn_row.addWidget(self.status_label)
+        btn_row.addStretch()
+        layout.addLayout(btn_row)
+
+        self.model = SweepTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        # Фиксированная высота строк: представление не измеряет каждую строку
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        info_label = QLabel("* Зеленым выделен материал с наименьшим расходом для каждого сочетания")
+        info_label.setStyleSheet("color: #666;")
+        layout.addWidget(info_label)
+
+    def _load_data(self):
+        """Загрузка справочных данных (из кэша material_sweep)"""
+        try:
+            reference = get_reference()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка загрузки данных", f"Не удалось загрузить данные: {str(e)}")
+            return
+        for pt_id, name, _ in reference.product_types:
+            self.product_type_combo.addItem(name, pt_id)
+        for mt_id, name, defect in reference.material_types:
+            item = QListWidgetItem(f"{name} (брак: {defect:.4f}%)")
+            item.setData(Qt.ItemDataRole.UserRole, (mt_id, name))
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            self.material_list.addItem(item)
+
+    @staticmethod
+    def _parse_range(fields) -> np.ndarray:
+        start_edit, stop_edit, count_spin = fields
+        start = float(start_edit.text().replace(',', '.'))
+        stop = float(stop_edit.text().replace(',', '.'))
+        if start <= 0 or stop <= 0:
+            raise ValueError("Границы диапазонов должны быть положительными числами")
+        return np.linspace(start, stop, count_spin.value())
+
+    def _run(self):
+        """Расчет сетки и вывод в таблицу"""
+        materials = [
+            self.material_list.item(i).data(Qt.ItemDataRole.UserRole)
+            for i in range(self.material_list.count())
+            if self.material_list.item(i).checkState() == Qt.CheckState.Checked
+        ]
+        if not materials:
+            QMessageBox.warning(self, "Ошибка ввода", "Выберите хотя бы один тип материала")
+            return
+        product_type_id = self.product_type_combo.currentData()
+        if product_type_id is None:
+            QMessageBox.warning(self, "Ошибка ввода", "Выберите тип продукции")
+            return
+        try:
+            quantities = np.unique(np.round(self._parse_range(self.quantity_range)))
+            param1 = self._parse_range(self.param1_range)
+            param2 = self._parse_range(self.param2_range)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка ввода", str(e))
+            return
+        points = len(quantities) * len(param1) * len(param2)
+        if points > MAX_GRID_POINTS:
+            QMessageBox.warning(
+                self, "Ошибка ввода",
+                f"Слишком большая сетка: {points:,} точек (не более {MAX_GRID_POINTS:,})",
+            )
+            return
+
+        t0 = time.perf_counter()
+        try:
+            result = run_sweep(
+                product_type_id,
+                [mt_id for mt_id, _ in materials],
+                quantities, param1, param2,
+            )
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка ввода", str(e))
+            return
+        elapsed = (time.perf_counter() - t0) * 1000
+        self.model.set_result(result, [name for _, name in materials])
+        self.status_label.setText(
+            f"{points * len(materials):,} значений рассчитано за {elapsed:.0f} мс".replace(",", " ")
+        )
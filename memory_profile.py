@@ -0,0 +1,247 @@
+"""
+memory_profile.py — замеры памяти этапов загрузки и импорта
+----------------------------------------------------------
+
+Функции:
+* Снимки tracemalloc и RSS процесса до и после этапа (memory_stage):
+  загрузка и построение страниц, обновление списка, этапы импорта
+* Места выделения памяти с наибольшим приростом за этап
+* Прирост памяти за цикл при многократном повторении действия
+  (measure_cycles) — для поиска утечек
+
+Замеры включаются переменной окружения APP_MEMORY_PROFILE=1 (или
+enable()); без нее memory_stage ничего не делает. Отчет по каждому
+этапу пишется в журнал (logging), число мест задает APP_MEMORY_TOP.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import gc
+import linecache
+import logging
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, List, NamedTuple, Optional
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("APP_MEMORY_PROFILE") == "1"
+TOP_SITES = int(os.environ.get("APP_MEMORY_TOP", "10"))
+# Глубина стека выделений: места внутри pandas и SQLAlchemy сводятся
+# к строке кода приложения, из которой они вызваны
+TRACE_FRAMES = 25
+
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, __file__, "<frozen importlib._bootstrap>")
+
+
+class AllocationSite(NamedTuple):
+    location: str   # "файл:строка"
+    size_diff: int  # прирост, байт
+    count_diff: int  # прирост числа блоков
+
+
+class StageMemory(NamedTuple):
+    stage: str
+    rss_before: Optional[int]
+    rss_after: Optional[int]
+    traced_diff: int  # прирост памяти, отслеживаемой tracemalloc, байт
+    traced_peak: int  # пик за этап относительно начала этапа, байт
+    top_sites: List[AllocationSite]
+
+
+class CycleMemory(NamedTuple):
+    name: str
+    rss: List[Optional[int]]  # RSS после каждого цикла
+    traced: List[int]         # память tracemalloc после каждого цикла
+    top_sites: List[AllocationSite]  # прирост между первым и последним циклом
+
+    @property
+    def rss_growth_per_cycle(self) -> Optional[float]:
+        if len(self.rss) < 2 or None in self.rss:
+            return None
+        return (self.rss[-1] - self.rss[0]) / (len(self.rss) - 1)
+
+    @property
+    def traced_growth_per_cycle(self) -> float:
+        if len(self.traced) < 2:
+            return 0.0
+        return (self.traced[-1] - self.traced[0]) / (len(self.traced) - 1)
+
+
+# Результаты этапов текущего процесса (для отчета в конце работы)
+records: List[StageMemory] = []
+_records_lock = threading.Lock()
+# Число выполняемых замеров: вложенные этапы не замеряются отдельно,
+# чтобы их снимки не искажали и не замедляли внешний замер
+_active = 0
+
+
+def enable():
+    """Включение замеров в текущем процессе"""
+    global ENABLED
+    ENABLED = True
+
+
+def current_rss() -> Optional[int]:
+    """Текущий RSS процесса в байтах (None, если недоступен)"""
+    try:
+        import psutil
+    except ImportError:
+        pass
+    else:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def release_free_memory():
+    """
+    Сборка мусора и возврат свободной памяти кучи системе (malloc_trim,
+    только glibc). Без этого RSS после освобождения объектов не уменьшается,
+    и прирост при повторном построении занижен.
+    """
+    gc.collect()
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _ensure_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+
+
+def top_sites(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+              limit: int = TOP_SITES) -> List[AllocationSite]:
+    """Места выделения с наибольшим приростом памяти между снимками"""
+    # Служебные выделения отсеиваются после группировки: Snapshot.filter_traces
+    # перебирает все трассы в Python и на больших кучах работает минутами
+    stats = [
+        s for s in after.compare_to(before, "lineno")
+        if s.size_diff > 0 and s.traceback[0].filename not in _IGNORED_FILES
+    ]
+    stats.sort(key=lambda s: s.size_diff, reverse=True)
+    return [
+        AllocationSite(f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                       s.size_diff, s.count_diff)
+        for s in stats[:limit]
+    ]
+
+
+def _mb(value: Optional[float]) -> str:
+    return "—" if value is None else f"{value / 2**20:+.2f} МБ"
+
+
+def format_stage(rec: StageMemory) -> str:
+    rss = None if None in (rec.rss_before, rec.rss_after) else rec.rss_after - rec.rss_before
+    lines = [
+        f"Память, {rec.stage}: RSS {_mb(rss)}, tracemalloc {_mb(rec.traced_diff)}, "
+        f"пик {_mb(rec.traced_peak)}"
+    ]
+    for site in rec.top_sites:
+        lines.append(f"    {site.location}: {_mb(site.size_diff)} ({site.count_diff:+d} блоков)")
+    return "\n".join(lines)
+
+
+@contextmanager
+def memory_stage(stage: str):
+    """
+    Замер памяти этапа: RSS, прирост и пик tracemalloc, места выделения.
+
+    При выключенных замерах не делает ничего. tracemalloc учитывает
+    выделения всех потоков, поэтому параллельная работа (например,
+    фоновая загрузка страницы) попадает в отчет этапа.
+    """
+    global _active
+    with _records_lock:
+        nested = _active > 0
+        _active += 1
+    if not ENABLED or nested:
+        try:
+            yield
+        finally:
+            with _records_lock:
+                _active -= 1
+        return
+    _ensure_tracing()
+    before = tracemalloc.take_snapshot()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    rss_before = current_rss()
+    try:
+        yield
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        # RSS — до снимка: сам снимок занимает десятки мегабайт
+        rss_after = current_rss()
+        after = tracemalloc.take_snapshot()
+        rec = StageMemory(stage, rss_before, rss_after, current - base,
+                          peak - base, top_sites(before, after))
+        with _records_lock:
+            records.append(rec)
+            _active -= 1
+        log.info(format_stage(rec))
+
+
+def measure_cycles(name: str, action: Callable[[], None], cycles: int = 5,
+                   settle: Optional[Callable[[], None]] = None,
+                   warmup: int = 1, trace: bool = True) -> CycleMemory:
+    """
+    Прирост памяти при многократном повторении действия.
+
+    После каждого цикла вызывается settle (например, обработка отложенных
+    удалений Qt) и сборка мусора. Первые warmup циклов — прогрев
+    (кэши, пулы распределителя памяти): их память в отчет не входит.
+
+    Аргументы:
+        name: Название для отчета
+        action: Повторяемое действие
+        cycles: Число замеряемых повторений (не меньше 2)
+        settle: Действие после каждого цикла перед замером
+        warmup: Число повторений прогрева
+        trace: Вести tracemalloc и искать места прироста; таблицы трасс
+               сами занимают память, поэтому для точного RSS — False
+
+    Возвращает:
+        CycleMemory с RSS и памятью tracemalloc после каждого цикла
+    """
+    global _active
+    if trace:
+        _ensure_tracing()
+    rss, traced = [], []
+    first = None
+    with _records_lock:
+        _active += 1
+    try:
+        for i in range(warmup + max(cycles, 2)):
+            action()
+            if settle is not None:
+                settle()
+            gc.collect()
+            if i < warmup:
+                continue
+            rss.append(current_rss())
+            if trace:
+                traced.append(tracemalloc.get_traced_memory()[0])
+                if first is None:
+                    first = tracemalloc.take_snapshot()
+        sites = top_sites(first, tracemalloc.take_snapshot()) if trace else []
+        result = CycleMemory(name, rss, traced, sites)
+    finally:
+        with _records_lock:
+            _active -= 1
+    log.info(
+        "Память, %s: прирост за цикл RSS %s, tracemalloc %s",
+        name, _mb(result.rss_growth_per_cycle), _mb(result.traced_growth_per_cycle),
+    )
+    return result
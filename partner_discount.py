@@ -4,31 +4,16 @@ partner_discount.py — модуль расчета скидок для парт
 
 Функции:
 * Расчет скидки в зависимости от объема закупок
-* Получение общего количества продукции партнера
-"""
-from sqlalchemy.orm import Session
-from DB_prepare import PartnerProduct
 
+Объем закупок партнеров суммируется в partner_ranking.rank_partners.
+"""
 
-def get_partner_total_qty(session: Session, partner_id: int) -> int:
-    """
-    Получение общего количества продукции, закупленной партнером.
-    
-    Аргументы:
-        session: Сессия SQLAlchemy
-        partner_id: Идентификатор партнера
-        
-    Возвращает:
-        Целое число - общее количество продукции
-    """
-    result = (
-        session.query(PartnerProduct)
-        .filter(PartnerProduct.partner_id == partner_id)
-        .all()
-    )
-    
-    total_qty = sum(pp.quantity or 0 for pp in result)
-    return total_qty
+# Пороги скидок: (минимальный объем закупок, процент скидки), по убыванию объема
+DISCOUNT_TIERS = [
+    (100_000, 15),
+    (50_000, 10),
+    (10_000, 5),
+]
 
 
 def calculate_discount(total_qty: int) -> int:
@@ -41,11 +26,7 @@ def calculate_discount(total_qty: int) -> int:
     Возвращает:
         Целое число - процент скидки
     """
-    if total_qty < 10_000:
-        return 0
-    elif total_qty < 50_000:
-        return 5
-    elif total_qty < 100_000:
-        return 10
-    else:
-        return 15
\ No newline at end of file
+    for min_qty, discount in DISCOUNT_TIERS:
+        if total_qty >= min_qty:
+            return discount
+    return 0
@@ -0,0 +1,146 @@
+"""
+partner_list_cache.py — дисковый кэш списка партнеров
+----------------------------------------------------
+
+Функции:
+* Данные карточек списка партнеров (CardData) без объектов ORM
+* Сохранение показанного списка в сжатый файл при выходе и чтение
+  при следующем запуске: карточки отображаются сразу, до запроса к базе
+* Отпечаток базы (наибольшие id и число строк основных таблиц, размер
+  и время изменения файлов базы) для проверки актуальности кэша
+* Отслеживание изменений, сделанных другими соединениями, по PRAGMA
+  data_version во время работы приложения
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from DB_prepare import DB_PATH
+from partner_ranking import PartnerRank
+
+CACHE_VERSION = 1
+CACHE_PATH = DB_PATH.with_name(DB_PATH.stem + ".cards.json.gz")
+
+# Таблицы, от которых зависят карточки; main — чтобы не читать
+# объединяющее представление архивов (архивы неизменяемы)
+_FINGERPRINT_SQL = text("""
+SELECT (SELECT max(id) FROM main.partners), (SELECT count(*) FROM main.partners),
+       (SELECT max(id) FROM main.partner_types), (SELECT count(*) FROM main.partner_types),
+       (SELECT max(id) FROM main.partner_products), (SELECT count(*) FROM main.partner_products)
+""")
+
+
+class CardData(NamedTuple):
+    partner_id: int
+    type_name: str
+    name: str
+    director: Optional[str]
+    phone: Optional[str]
+    rating: Optional[int]
+    discount: int
+    rank: Optional[int]
+
+
+class CachedList(NamedTuple):
+    fingerprint: list
+    types: List[tuple]  # (наименование, идентификатор) для фильтра по типу
+    cards: List[CardData]
+
+
+def card_from_rank(r: PartnerRank) -> CardData:
+    p = r.partner
+    return CardData(p.id, p.partner_type.name, p.name, p.director, p.phone,
+                    p.rating, r.discount, r.rank)
+
+
+def db_fingerprint(session: Session, db_path: Path = DB_PATH) -> list:
+    """
+    Отпечаток состояния базы.
+
+    Наибольшие id и число строк меняются при добавлении и удалении,
+    размер и время изменения файлов — при любой записи, в том числе
+    при изменении существующих строк.
+    """
+    fingerprint = list(session.execute(_FINGERPRINT_SQL).one())
+    for suffix in ("", "-wal"):
+        path = Path(str(db_path) + suffix)
+        if path.exists():
+            st = path.stat()
+            fingerprint += [st.st_size, st.st_mtime_ns]
+    return fingerprint
+
+
+def load_cache(path: Path = CACHE_PATH) -> Optional[Tuple[dict, CachedList]]:
+    """
+    Чтение кэша списка.
+
+    Возвращает:
+        (параметры отбора, с которыми список был показан, CachedList) или
+        None, если файла нет, он поврежден или записан другой версией
+        либо для другой базы
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CACHE_VERSION or data.get("db") != str(DB_PATH.resolve()):
+        return None
+    return data["criteria"], CachedList(
+        data["fingerprint"],
+        [tuple(t) for t in data["types"]],
+        [CardData(*card) for card in data["cards"]],
+    )
+
+
+def save_cache(criteria: dict, cached: CachedList, path: Path = CACHE_PATH):
+    """Запись кэша списка (через временный файл, чтобы не оставить неполный)"""
+    data = {
+        "version": CACHE_VERSION,
+        "db": str(DB_PATH.resolve()),
+        "criteria": criteria,
+        "fingerprint": cached.fingerprint,
+        "types": cached.types,
+        "cards": cached.cards,
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class DataVersionWatcher:
+    """
+    Проверка, были ли изменения базы другими соединениями.
+
+    PRAGMA data_version меняется, когда другое соединение фиксирует
+    транзакцию; значение имеет смысл только в пределах одного
+    соединения, поэтому оно держится открытым все время работы.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH):
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._version = self._read()
+
+    def _read(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        """True, если с прошлой проверки база изменилась"""
+        version = self._read()
+        if version == self._version:
+            return False
+        self._version = version
+        return True
+
+    def close(self):
+        self._conn.close()
@@ -13,9 +13,19 @@ from PySide6.QtWidgets import (
     QTableWidgetItem,
     QHeaderView,
 )
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 from DB_prepare import ENGINE, Partner, PartnerProduct, Product
+from memory_profile import memory_stage
+
+# История продаж партнера: только нужные колонки, без загрузки ORM объектов
+HISTORY_STMT = (
+    select(Product.name, PartnerProduct.quantity, PartnerProduct.sale_date)
+    .join(Product, PartnerProduct.product_id == Product.id)
+    .where(PartnerProduct.partner_id == bindparam("partner_id"))
+    .order_by(PartnerProduct.sale_date.desc())
+)
 
 
 class PartnerProductHistoryPage(QWidget):
@@ -61,6 +71,7 @@ class PartnerProductHistoryPage(QWidget):
         self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
         layout.addWidget(self.table)
 
+    @memory_stage("история продаж")
     def load_partner_history(self, partner: Partner):
         """Загрузка истории реализации продукции для партнера"""
         self.partner = partner
@@ -70,39 +81,26 @@ class PartnerProductHistoryPage(QWidget):
         self.table.setRowCount(0)
         
         with Session(ENGINE) as session:
-            # Получаем партнера с присоединенными данными
-            partner_obj = (
-                session.query(Partner)
-                .filter(Partner.id == partner.id)
-                .first()
-            )
-            
-            if not partner_obj:
+            # Проверяем, что партнер существует
+            if session.get(Partner, partner.id) is None:
                 return
             
             # Загружаем историю реализации продукции
-            partner_products = (
-                session.query(PartnerProduct, Product)
-                .join(Product, PartnerProduct.product_id == Product.id)
-                .filter(PartnerProduct.partner_id == partner.id)
-                .order_by(PartnerProduct.sale_date.desc())
-                .all()
-            )
+            partner_products = session.execute(HISTORY_STMT, {"partner_id": partner.id}).all()
             
             # Заполняем таблицу
-            for i, (pp, product) in enumerate(partner_products):
-                self.table.insertRow(i)
-                
+            self.table.setRowCount(len(partner_products))
+            for i, (product_name, quantity, sale_date) in enumerate(partner_products):
                 # Наименование продукции
-                self.table.setItem(i, 0, QTableWidgetItem(product.name))
+                self.table.setItem(i, 0, QTableWidgetItem(product_name))
                 
                 # Количество
-                qty_item = QTableWidgetItem(str(pp.quantity))
+                qty_item = QTableWidgetItem(str(quantity))
                 qty_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.table.setItem(i, 1, qty_item)
                 
                 # Дата продажи
-                date_str = pp.sale_date.strftime("%d.%m.%Y") if pp.sale_date else "—"
+                date_str = sale_date.strftime("%d.%m.%Y") if sale_date else "—"
                 date_item = QTableWidgetItem(date_str)
                 date_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
                 self.table.setItem(i, 2, date_item)
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+partner_ranking.py — рейтинг и отбор партнеров
+---------------------------------------------
+
+Функции:
+* Сортировка партнеров по объему продаж, скидке, рейтингу или наименованию
+* Отбор по типу партнера, минимальной скидке и минимальному рейтингу
+* Места в рейтинге (DENSE_RANK) и постраничная выдача первых N партнеров
+
+Объемы суммируются в подзапросе по partner_products, места и порядок
+считаются оконной функцией на стороне базы — без расчета скидки
+для каждого партнера в Python.
+"""
+from __future__ import annotations
+
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Integer, bindparam, case, func, or_, select
+from sqlalchemy.orm import Session, contains_eager
+
+from DB_prepare import Partner, PartnerProduct, PartnerType
+from partner_discount import DISCOUNT_TIERS
+
+SORT_NAME = "name"
+SORT_TOTAL_QTY = "total_qty"
+SORT_DISCOUNT = "discount"
+SORT_RATING = "rating"
+
+# LIMIT -1 в SQLite — без ограничения
+NO_LIMIT = -1
+
+
+class PartnerRank(NamedTuple):
+    partner: Partner
+    total_qty: int
+    discount: int
+    rank: Optional[int]  # None при сортировке по наименованию
+
+
+def discount_expr(total_qty):
+    """SQL-выражение скидки, совпадающее с calculate_discount"""
+    return case(
+        *((total_qty >= min_qty, discount) for min_qty, discount in DISCOUNT_TIERS),
+        else_=0,
+    )
+
+
+# Запросы собираются один раз, по одному на вариант сортировки; отбор и
+# страница передаются параметрами (NULL — без отбора), а скомпилированный
+# SQL берется из кэша движка
+_TOTALS = (
+    select(
+        PartnerProduct.partner_id.label("partner_id"),
+        func.sum(PartnerProduct.quantity).label("total_qty"),
+    )
+    .group_by(PartnerProduct.partner_id)
+    .subquery("totals")
+)
+_TOTAL_QTY = func.coalesce(_TOTALS.c.total_qty, 0)
+_DISCOUNT = discount_expr(_TOTAL_QTY)
+_METRICS = {
+    SORT_TOTAL_QTY: _TOTAL_QTY,
+    SORT_DISCOUNT: _DISCOUNT,
+    SORT_RATING: func.coalesce(Partner.rating, 0),
+}
+
+
+def _rank_stmt(sort: str):
+    partner_type_id = bindparam("partner_type_id", type_=Integer)
+    min_discount = bindparam("min_discount", type_=Integer)
+    min_rating = bindparam("min_rating", type_=Integer)
+
+    metric = _METRICS.get(sort)
+    columns = [Partner, _TOTAL_QTY, _DISCOUNT]
+    if metric is not None:
+        columns.append(func.dense_rank().over(order_by=metric.desc()))
+        order = (metric.desc(), Partner.name)
+    else:
+        order = (Partner.name,)
+    return (
+        select(*columns)
+        .join(Partner.partner_type)
+        .options(contains_eager(Partner.partner_type))
+        .outerjoin(_TOTALS, _TOTALS.c.partner_id == Partner.id)
+        .where(
+            or_(partner_type_id.is_(None), Partner.partner_type_id == partner_type_id),
+            or_(min_discount.is_(None), _DISCOUNT >= min_discount),
+            or_(min_rating.is_(None), Partner.rating >= min_rating),
+        )
+        .order_by(*order)
+        .limit(bindparam("limit", type_=Integer))
+        .offset(bindparam("offset", type_=Integer))
+    )
+
+
+RANK_STMTS = {sort: _rank_stmt(sort) for sort in (SORT_NAME, *_METRICS)}
+
+PARTNER_TYPES_STMT = select(PartnerType.name, PartnerType.id).order_by(PartnerType.name)
+
+
+def rank_partners(
+    session: Session,
+    sort: str = SORT_NAME,
+    partner_type_id: Optional[int] = None,
+    min_discount: Optional[int] = None,
+    min_rating: Optional[int] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> List[PartnerRank]:
+    """
+    Список партнеров с объемом продаж, скидкой и местом в рейтинге.
+
+    Аргументы:
+        session: Сессия SQLAlchemy
+        sort: Поле сортировки (SORT_NAME, SORT_TOTAL_QTY, SORT_DISCOUNT, SORT_RATING);
+              кроме наименования, сортировка по убыванию
+        partner_type_id: Только партнеры указанного типа
+        min_discount: Только партнеры со скидкой не меньше указанной
+        min_rating: Только партнеры с рейтингом не меньше указанного
+        limit: Размер страницы (None — все)
+        offset: Смещение страницы
+
+    Возвращает:
+        Список PartnerRank в порядке сортировки
+    """
+    ranked = sort in _METRICS
+    rows = session.execute(
+        RANK_STMTS[sort if ranked else SORT_NAME],
+        {
+            "partner_type_id": partner_type_id,
+            "min_discount": min_discount,
+            "min_rating": min_rating,
+            "limit": NO_LIMIT if limit is None else limit,
+            "offset": offset,
+        },
+    ).all()
+    return [
+        PartnerRank(row[0], int(row[1]), int(row[2]), row[3] if ranked else None)
+        for row in rows
+    ]
+
+
+def partner_type_choices(session: Session) -> list[tuple[str, int]]:
+    """Типы партнеров для фильтра: (наименование, идентификатор)"""
+    return [tuple(row) for row in session.execute(PARTNER_TYPES_STMT)]
@@ -0,0 +1,329 @@
+"""
+partner_statements.py — выписки продаж по партнерам
+--------------------------------------------------
+
+Функции:
+* Выписка для каждого партнера: продажи за период, итог и скидка
+  (calculate_discount по общему объему продаж партнера)
+* Параллельная генерация в пуле процессов: партнеры делятся на пакеты
+  по возрастанию идентификатора, каждый процесс открывает собственное
+  соединение только для чтения и читает продажи пакета одним потоком
+  строк в порядке partner_id
+* Форматы XLSX (openpyxl, потоковая запись) и CSV
+* Отчет о ходе выполнения и файл контрольной точки для продолжения
+  прерванной генерации
+
+Запуск: python partner_statements.py --out statements [--format csv]
+[--workers 4] [--date-from 2024-01-01 --date-to 2024-12-31] [--restart]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime as dt
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from openpyxl import Workbook
+
+from DB_prepare import ARCHIVE_DIR, DB_PATH
+from partner_discount import calculate_discount
+from sales_archive import attach_archives
+from sales_layout import ROWID, connection_layout, date_param
+
+FORMATS = ("xlsx", "csv")
+CHECKPOINT_NAME = "statements.checkpoint"
+DEFAULT_CHUNK_SIZE = 100
+
+STATEMENT_COLUMNS = ("Дата продажи", "Артикул", "Продукция", "Количество")
+# Дата продажи, не указанная при импорте
+UNDATED = "без даты"
+
+# Границы периода без ограничения
+OPEN_FROM = dt.date.min.isoformat()
+OPEN_TO = dt.date.max.isoformat()
+
+_PARTNERS_SQL = """
+SELECT p.id, p.name, p.inn, t.name
+FROM partners p JOIN partner_types t ON t.id = p.partner_type_id
+WHERE p.id BETWEEN ? AND ?
+ORDER BY p.id
+"""
+
+_TOTALS_SQL = """
+SELECT partner_id, SUM(quantity)
+FROM partner_products
+WHERE partner_id BETWEEN ? AND ?
+GROUP BY partner_id
+"""
+
+# date() возвращает ISO и для номера дня компактной схемы (sales_layout).
+# Продажи без даты попадают только в выписку за весь период — так ее
+# "Итого за период" совпадает с общим объемом продаж
+_SALES_SQL = """
+SELECT pp.partner_id, date(pp.sale_date), pr.article, pr.name, pp.quantity
+FROM partner_products pp JOIN products pr ON pr.id = pp.product_id
+WHERE pp.partner_id BETWEEN ? AND ?
+  AND (pp.sale_date >= ? AND pp.sale_date <= ? OR (? AND pp.sale_date IS NULL))
+ORDER BY pp.partner_id, pp.sale_date
+"""
+
+# Соединение процесса-обработчика (открывается в _init_worker)
+_conn: Optional[sqlite3.Connection] = None
+_layout = ROWID
+
+
+def _init_worker(db_path: str, archive_dir: str):
+    """Открытие соединения только для чтения в процессе пула"""
+    global _conn, _layout
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    _conn = sqlite3.connect(uri, uri=True)
+    _layout = connection_layout(_conn)
+    attach_archives(_conn, Path(archive_dir))
+
+
+def _write_xlsx(path: Path, header: List[tuple], rows: Iterable[tuple], footer: List[tuple]):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Выписка")
+    for line in header:
+        ws.append(line)
+    ws.append(())
+    ws.append(STATEMENT_COLUMNS)
+    for sale_date, article, name, qty in rows:
+        ws.append((dt.date.fromisoformat(sale_date) if sale_date else UNDATED, article, name, qty))
+    ws.append(())
+    for line in footer:
+        ws.append(line)
+    wb.save(path)
+
+
+def _write_csv(path: Path, header: List[tuple], rows: Iterable[tuple], footer: List[tuple]):
+    # utf-8-sig и ";" — чтобы файл без настройки открывался в русском Excel
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerows(header)
+        writer.writerow(())
+        writer.writerow(STATEMENT_COLUMNS)
+        writer.writerows((sale_date or UNDATED, *rest) for sale_date, *rest in rows)
+        writer.writerow(())
+        writer.writerows(footer)
+
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv}
+
+
+def period_text(date_from: str, date_to: str) -> str:
+    """Период выписки для заголовка; открытые границы не выводятся"""
+    if date_from == OPEN_FROM and date_to == OPEN_TO:
+        return "весь период"
+    if date_to == OPEN_TO:
+        return f"с {date_from}"
+    if date_from == OPEN_FROM:
+        return f"по {date_to}"
+    return f"{date_from} — {date_to}"
+
+
+def statement_path(out_dir: Path, partner_id: int, fmt: str) -> Path:
+    return out_dir / f"statement_{partner_id}.{fmt}"
+
+
+def _generate_chunk(partner_ids: List[int], out_dir: str, fmt: str,
+                    date_from: str, date_to: str) -> List[int]:
+    """
+    Выписки для пакета партнеров (выполняется в процессе пула).
+
+    Аргументы:
+        partner_ids: Идентификаторы партнеров по возрастанию
+        out_dir: Каталог для файлов
+        fmt: Формат файлов ("xlsx" или "csv")
+        date_from, date_to: Границы периода (ISO, включительно)
+
+    Возвращает:
+        Идентификаторы партнеров, для которых записаны выписки
+    """
+    out = Path(out_dir)
+    write = _WRITERS[fmt]
+    wanted = set(partner_ids)
+    bounds = (partner_ids[0], partner_ids[-1])
+
+    partners = [row for row in _conn.execute(_PARTNERS_SQL, bounds) if row[0] in wanted]
+    totals = dict(_conn.execute(_TOTALS_SQL, bounds))
+    whole_period = date_from == OPEN_FROM and date_to == OPEN_TO
+    period = (date_param(date_from, _layout), date_param(date_to, _layout), whole_period)
+    sales = groupby(_conn.execute(_SALES_SQL, (*bounds, *period)), key=lambda row: row[0])
+    group_id, group = next(sales, (None, iter(())))
+
+    done = []
+    for partner_id, name, inn, type_name in partners:
+        # Пропускаем продажи партнеров вне пакета (остались от прерванного запуска)
+        while group_id is not None and group_id < partner_id:
+            group_id, group = next(sales, (None, iter(())))
+        rows = []
+        if group_id == partner_id:
+            rows = [row[1:] for row in group]
+            group_id, group = next(sales, (None, iter(())))
+
+        period_qty = sum(row[3] or 0 for row in rows)
+        total_qty = int(totals.get(partner_id) or 0)
+        header = [
+            ("Партнер", f"{type_name} | {name}"),
+            ("ИНН", inn),
+            ("Период", period_text(date_from, date_to)),
+        ]
+        footer = [
+            ("Итого за период", period_qty),
+            ("Общий объем продаж", total_qty),
+            ("Скидка, %", calculate_discount(total_qty)),
+        ]
+        path = statement_path(out, partner_id, fmt)
+        tmp = path.with_suffix(".tmp")
+        write(tmp, header, rows, footer)
+        # Файл появляется целиком: прерванная запись не оставит неполной выписки
+        os.replace(tmp, path)
+        done.append(partner_id)
+    return done
+
+
+def _read_checkpoint(path: Path, params: dict) -> set:
+    """Партнеры, выписки которых уже готовы; пустое множество, если файла нет"""
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines:
+        return set()
+    if lines[0].get("params") != params:
+        raise RuntimeError(
+            f"Контрольная точка {path} создана с другими параметрами; "
+            f"запустите с --restart, чтобы начать заново"
+        )
+    return {pid for line in lines[1:] for pid in line["done"]}
+
+
+def generate_statements(
+    out_dir: Path,
+    fmt: str = "xlsx",
+    workers: Optional[int] = None,
+    date_from: Optional[dt.date] = None,
+    date_to: Optional[dt.date] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    restart: bool = False,
+    db_path: Path = DB_PATH,
+    archive_dir: Path = ARCHIVE_DIR,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Генерация выписок для всех партнеров.
+
+    Аргументы:
+        out_dir: Каталог для файлов (создается при необходимости)
+        fmt: Формат файлов ("xlsx" или "csv")
+        workers: Число процессов (None — по числу ядер)
+        date_from, date_to: Период выписки (None — без ограничения); продажи
+            без даты входят только в выписку за весь период
+        chunk_size: Число партнеров в одном задании
+        restart: Игнорировать контрольную точку и начать заново
+        db_path: Путь к базе
+        archive_dir: Каталог архивов продаж
+        progress: Функция progress(готово, всего), вызывается по мере выполнения
+
+    Возвращает:
+        Число выписок, записанных в этом запуске
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    params = {
+        "format": fmt,
+        "date_from": date_from.isoformat() if date_from else OPEN_FROM,
+        "date_to": date_to.isoformat() if date_to else OPEN_TO,
+    }
+
+    checkpoint = out_dir / CHECKPOINT_NAME
+    if restart and checkpoint.exists():
+        checkpoint.unlink()
+    done = _read_checkpoint(checkpoint, params)
+    # Недописанные файлы прерванного запуска
+    for tmp in out_dir.glob("statement_*.tmp"):
+        tmp.unlink()
+
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    with sqlite3.connect(uri, uri=True) as conn:
+        all_ids = [pid for (pid,) in conn.execute("SELECT id FROM partners ORDER BY id")]
+    pending = [pid for pid in all_ids if pid not in done]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    total, completed = len(all_ids), len(all_ids) - len(pending)
+    if progress:
+        progress(completed, total)
+    if not chunks:
+        return 0
+
+    with open(checkpoint, "a", encoding="utf-8") as cp, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(str(db_path), str(archive_dir)),
+    ) as pool:
+        if cp.tell() == 0:
+            cp.write(json.dumps({"params": params}) + "\n")
+            cp.flush()
+        futures = [
+            pool.submit(_generate_chunk, chunk, str(out_dir), fmt,
+                        params["date_from"], params["date_to"])
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            ids = future.result()
+            # Контрольная точка пишет только главный процесс, после готовых файлов
+            cp.write(json.dumps({"done": ids}) + "\n")
+            cp.flush()
+            completed += len(ids)
+            if progress:
+                progress(completed, total)
+    return len(pending)
+
+
+def _print_progress(completed: int, total: int):
+    percent = completed / total * 100 if total else 100
+    print(f"\rВыписки: {completed}/{total} ({percent:.0f}%)", end="", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выписки продаж по партнерам")
+    parser.add_argument("--out", type=Path, default=Path("statements"),
+                        help="каталог для файлов выписок")
+    parser.add_argument("--format", choices=FORMATS, default="xlsx")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="число процессов (по умолчанию — число ядер)")
+    parser.add_argument("--date-from", type=dt.date.fromisoformat, default=None)
+    parser.add_argument("--date-to", type=dt.date.fromisoformat, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true",
+                        help="не продолжать с контрольной точки, а начать заново")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        written = generate_statements(
+            args.out, args.format, args.workers, args.date_from, args.date_to,
+            args.chunk_size, args.restart, progress=_print_progress,
+        )
+    except BrokenProcessPool:
+        raise
+    except RuntimeError as e:
+        # Контрольная точка от запуска с другими параметрами
+        parser.exit(1, f"{e}\n")
+    print(file=sys.stderr)
+    print(f"Записано выписок: {written} за {time.perf_counter() - t0:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
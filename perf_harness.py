@@ -0,0 +1,459 @@
+"""
+perf_harness.py — замеры производительности интерфейса без экрана
+----------------------------------------------------------------
+
+Функции:
+* Генерация баз данных заданного размера (партнеры × продажи)
+  в обычной или компактной схеме продаж (--layout, см. sales_layout)
+* Построение MainWindow на платформе Qt "offscreen" для каждой базы
+  (в отдельном процессе, чтобы замеры памяти не смешивались)
+* Замер PartnerListPage.refresh, load_partner_history для партнера
+  с наибольшей историей и MaterialCalculatorPage._calculate
+* Пиковый RSS процесса и количество объектов Qt
+* Память (memory_profile): RSS на партнера при построении списка,
+  прирост за цикл при повторных обновлениях списка и загрузках истории,
+  пик памяти на строку при проверке импортируемых продаж (только
+  проверка, без чтения Excel и записи в базу)
+* Запись результатов в perf_results.jsonl для сравнения между запусками
+  и проверка бюджетов (код возврата 1 при превышении)
+
+Пример:
+    python perf_harness.py --sizes 100 1000 --sales-per-partner 50 \\
+        --budgets perf_budgets.json
+
+Формат файла бюджетов: {"<число партнеров>" или "*": {"<метрика>": предел}};
+ключи, начинающиеся с "_", при проверке не читаются.
+
+Пределы в perf_budgets.json получены из замеров, записанных в нем же
+в разделе "_baseline": --sales-per-partner 50, --repeats 5, схема rowid,
+наибольшее значение из трех запусков (для 10000 партнеров — один запуск
+с --repeats 2, он идет около часа). Запас над замером: время × 1,5,
+память × 1,25, с округлением вверх; прирост памяти за цикл замеряется
+около нуля, для него предел — 256 КБ. После изменений, меняющих замеры,
+бюджеты пересчитываются тем же способом.
+
+Обновление списка растет быстрее числа партнеров: каждая карточка —
+отдельный набор виджетов в одном QVBoxLayout, и большая часть времени
+уходит на раскладку и удаление виджетов в цикле событий Qt (100 партнеров —
+0,15 с, 1000 — 3 с, 10000 — 3 мин).
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from sales_layout import LAYOUTS, ROWID, migrate
+
+BASE_DIR = Path(__file__).resolve().parent
+RESULTS_PATH = BASE_DIR / "perf_results.jsonl"
+
+# Метрики, для которых действуют бюджеты
+METRICS = (
+    "window_build_ms",
+    "list_refresh_ms",
+    "history_load_ms",
+    "calculate_ms",
+    "peak_rss_mb",
+    "qt_objects",
+    "list_rss_kb_per_partner",
+    "list_refresh_growth_kb",
+    "history_growth_kb",
+    "import_validation_bytes_per_row",
+)
+
+
+# Генерация данных
+def generate_database(path: Path, partners: int, sales_per_partner: int, seed: int = 1,
+                      layout: str = ROWID):
+    """
+    Создание базы со схемой приложения и синтетическими данными.
+
+    Аргументы:
+        path: Путь к создаваемому файлу базы
+        partners: Количество партнеров
+        sales_per_partner: Среднее количество продаж на партнера
+        seed: Зерно генератора случайных чисел
+        layout: Схема хранения продаж (sales_layout)
+    """
+    from sqlalchemy import create_engine
+
+    from DB_prepare import Base
+
+    if path.exists():
+        path.unlink()
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    rnd = random.Random(seed)
+    con = sqlite3.connect(path)
+    try:
+        con.executemany(
+            "INSERT INTO partner_types (id, name) VALUES (?, ?)",
+            [(i, name) for i, name in enumerate(("ЗАО", "ООО", "ПАО", "ОАО"), start=1)],
+        )
+        con.executemany(
+            "INSERT INTO product_types (id, name, coefficient) VALUES (?, ?, ?)",
+            [(i, f"Тип продукции {i}", round(rnd.uniform(1, 6), 2)) for i in range(1, 5)],
+        )
+        con.executemany(
+            "INSERT INTO material_types (id, name, defect_percentage) VALUES (?, ?, ?)",
+            [(i, f"Тип материала {i}", round(rnd.uniform(0.1, 1), 2)) for i in range(1, 6)],
+        )
+        products = 100
+        con.executemany(
+            "INSERT INTO products (id, product_type_id, article, name, min_partner_price) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(i, rnd.randint(1, 4), 1_000_000 + i, f"Продукция {i}", rnd.randint(1000, 9000))
+             for i in range(1, products + 1)],
+        )
+        con.executemany(
+            "INSERT INTO partners (id, partner_type_id, name, legal_address, inn, director, "
+            "phone, email, rating) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (i, rnd.randint(1, 4), f"Партнер {i:07d}", f"г. Город, ул. Улица, {i}",
+                 f"{rnd.randrange(10**9, 10**10)}", f"Директор {i}",
+                 f"900 {rnd.randint(100, 999)} {rnd.randint(10, 99)} {rnd.randint(10, 99)}",
+                 f"partner{i}@example.ru", rnd.randint(0, 10))
+                for i in range(1, partners + 1)
+            ],
+        )
+        start = dt.date(2020, 1, 1).toordinal()
+        span = dt.date.today().toordinal() - start
+
+        def sales():
+            for partner_id in range(1, partners + 1):
+                # Разброс объема, чтобы у одного партнера история была заметно длиннее
+                count = rnd.randint(sales_per_partner // 2, sales_per_partner * 3 // 2)
+                if partner_id == 1:
+                    count = sales_per_partner * 10
+                for _ in range(count):
+                    yield (
+                        partner_id,
+                        rnd.randint(1, products),
+                        rnd.randint(100, 50_000),
+                        dt.date.fromordinal(start + rnd.randrange(span)).isoformat(),
+                    )
+
+        con.executemany(
+            "INSERT INTO partner_products (partner_id, product_id, quantity, sale_date) "
+            "VALUES (?, ?, ?, ?)",
+            sales(),
+        )
+        con.commit()
+    finally:
+        con.close()
+    migrate(path, layout)
+
+
+# Замеры в дочернем процессе
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _timed(fn, repeats: int) -> float:
+    """Медиана времени выполнения, мс"""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def measure_import_memory(rows: int, seed: int = 1) -> dict:
+    """
+    Память этапа проверки продаж при импорте (как в load_data) для
+    синтетической таблицы из rows строк в виде, который дает read_excel.
+
+    Замеряется только проверка таблицы: чтение Excel и вставка в базу
+    в метрику не входят, поэтому она не отражает полный импорт.
+    """
+    import pandas as pd
+
+    import memory_profile
+    from import_validation import reject_unknown, validate_partner_products
+
+    rnd = random.Random(seed)
+    partners = [f"Партнер {i:07d}" for i in range(1, max(rows // 50, 1) + 1)]
+    products = [f"Продукция {i}" for i in range(1, 101)]
+    start = dt.date(2020, 1, 1).toordinal()
+    df = pd.DataFrame({
+        "Продукция": [rnd.choice(products) for _ in range(rows)],
+        "Наименование партнера": [rnd.choice(partners) for _ in range(rows)],
+        "Количество продукции": [rnd.randint(100, 50_000) for _ in range(rows)],
+        "Дата продажи": [dt.date.fromordinal(start + rnd.randrange(2000)).strftime("%d.%m.%Y")
+                         for _ in range(rows)],
+    })
+
+    memory_profile.enable()
+    with memory_profile.memory_stage("импорт: проверка продаж"):
+        valid, bad_pp = validate_partner_products(df)
+        valid, bad_partner = reject_unknown(valid, "Наименование партнера", partners, "")
+        valid, bad_product = reject_unknown(valid, "Продукция", products, "")
+        pd.concat([bad_pp, bad_partner, bad_product])
+    rec = memory_profile.records[-1]
+    return {"import_validation_bytes_per_row": round(rec.traced_peak / rows, 1)}
+
+
+def run_once(repeats: int) -> dict:
+    """Замеры для базы из APP_DB_PATH; выполняется в отдельном процессе"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QEvent, QObject
+    from PySide6.QtWidgets import QApplication
+    from sqlalchemy import func
+    from sqlalchemy.orm import Session
+
+    import material_calculator
+    from DB_prepare import ENGINE, Partner, PartnerProduct
+    from main_app import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+
+    def flush_events():
+        # Удаление виджетов, отложенное через deleteLater
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+        app.processEvents()
+
+    t0 = time.perf_counter()
+    win = MainWindow()
+    win.resize(1200, 750)
+    win.show()
+    flush_events()
+    window_build_ms = (time.perf_counter() - t0) * 1000
+
+    list_page = win.list_page
+
+    def refresh():
+        # Без переиспользования карточек: замеряется полное построение списка
+        list_page._clear()
+        list_page.refresh_sync()
+        flush_events()
+
+    list_refresh_ms = _timed(refresh, repeats)
+
+    with Session(ENGINE) as session:
+        partner_id = (
+            session.query(PartnerProduct.partner_id)
+            .group_by(PartnerProduct.partner_id)
+            .order_by(func.count().desc())
+            .limit(1)
+            .scalar()
+        )
+        partner = session.get(Partner, partner_id)
+        partner.partner_type  # загрузка до закрытия сессии
+    history_page = win.history_page
+    history_load_ms = _timed(lambda: history_page.load_partner_history(partner), repeats)
+    history_rows = history_page.table.rowCount()
+
+    calculator = win.calculator_page
+    calculator.quantity_spin.setValue(100)
+    calculator.param1_edit.setText("2.5")
+    calculator.param2_edit.setText("1.5")
+
+    def calculate():
+        # Без кэша: замеряется полный расчет с обращением к базе
+        material_calculator.calculation_cache.clear()
+        calculator._calculate()
+
+    calculate_ms = _timed(calculate, repeats)
+    flush_events()
+    peak_rss_mb = _peak_rss_mb()
+    qt_objects = len(win.findChildren(QObject))
+    qt_widgets = len(QApplication.allWidgets())
+
+    # Память — после замеров времени. RSS замеряется без tracemalloc:
+    # его таблицы трасс сами увеличивают RSS
+    import memory_profile
+
+    def settle():
+        flush_events()
+        memory_profile.release_free_memory()
+
+    list_page._clear()
+    settle()
+    memory_profile.release_free_memory()
+    rss_before = memory_profile.current_rss()
+    list_page.refresh_sync()
+    settle()
+    rss_after = memory_profile.current_rss()
+    partners = max(len(list_page._cards), 1)
+    # Два цикла прогрева: первые перестроения списка заполняют кэши Qt и SQLAlchemy
+    list_cycles = memory_profile.measure_cycles(
+        "обновление списка", refresh, max(repeats, 4), settle, warmup=2, trace=False,
+    )
+    history_cycles = memory_profile.measure_cycles(
+        "загрузка истории", lambda: history_page.load_partner_history(partner),
+        max(repeats, 4), settle, warmup=2, trace=False,
+    )
+
+    # Места выделения: построение списка и прирост при повторных обновлениях
+    memory_profile.enable()
+    list_page._clear()
+    settle()
+    with memory_profile.memory_stage("список партнеров: полное построение"):
+        list_page.refresh_sync()
+        settle()
+    build = memory_profile.records[-1]
+    list_sites = memory_profile.measure_cycles("обновление списка", refresh, 2, settle).top_sites
+
+    def kb(value):
+        return round(value / 1024, 1) if value is not None else None
+
+    return {
+        "window_build_ms": round(window_build_ms, 2),
+        "list_refresh_ms": round(list_refresh_ms, 2),
+        "history_load_ms": round(history_load_ms, 2),
+        "history_rows": history_rows,
+        "calculate_ms": round(calculate_ms, 3),
+        "peak_rss_mb": round(peak_rss_mb or 0, 1),
+        "qt_objects": qt_objects,
+        "qt_widgets": qt_widgets,
+        "list_rss_kb_per_partner": kb((rss_after - rss_before) / partners
+                                      if rss_after is not None else None),
+        "list_traced_kb_per_partner": kb(build.traced_diff / partners),
+        "list_refresh_growth_kb": kb(list_cycles.rss_growth_per_cycle),
+        "history_growth_kb": kb(history_cycles.rss_growth_per_cycle),
+        "list_refresh_top_sites": [site._asdict() for site in list_sites[:5]],
+    }
+
+
+# Запуск, сравнение, бюджеты
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous_results(path: Path) -> dict:
+    """Последний результат для каждого (партнеры, продажи на партнера, схема продаж)"""
+    previous = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                rec = json.loads(line)
+                key = (rec["partners"], rec["sales_per_partner"], rec.get("layout", ROWID))
+                previous[key] = rec
+    return previous
+
+
+def check_budgets(record: dict, budgets: dict) -> list[str]:
+    """Список нарушений бюджета для одного результата"""
+    limits = {**budgets.get("*", {}), **budgets.get(str(record["partners"]), {})}
+    return [
+        f"{record['partners']} партнеров: {metric} = {record[metric]} > {limit}"
+        for metric, limit in limits.items()
+        if record.get(metric) is not None and record[metric] > limit
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности страниц приложения")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="количество партнеров в генерируемых базах")
+    parser.add_argument("--sales-per-partner", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--layout", choices=LAYOUTS, default=ROWID,
+                        help="схема хранения продаж в генерируемых базах")
+    parser.add_argument("--budgets", type=Path, default=None,
+                        help="JSON с пределами метрик")
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--workdir", type=Path, default=None,
+                        help="каталог для сгенерированных баз (по умолчанию временный)")
+    parser.add_argument("--run-once", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--import-rows", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_once:
+        print(json.dumps(run_once(args.repeats)))
+        return 0
+    if args.import_rows:
+        print(json.dumps(measure_import_memory(args.import_rows)))
+        return 0
+
+    budgets = json.loads(args.budgets.read_text(encoding="utf-8")) if args.budgets else {}
+    previous = _previous_results(args.results)
+    revision = _git_revision()
+    violations = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or Path(tmp)
+        for size in args.sizes:
+            db_dir = workdir / f"perf_{size}_{args.sales_per_partner}_{args.layout}"
+            db_dir.mkdir(parents=True, exist_ok=True)
+            db_path = db_dir / "app.db"
+            t0 = time.perf_counter()
+            generate_database(db_path, size, args.sales_per_partner, layout=args.layout)
+            print(f"База {size} партнеров создана за {time.perf_counter() - t0:.1f} с")
+
+            env = {**os.environ, "APP_DB_PATH": str(db_path), "QT_QPA_PLATFORM": "offscreen"}
+            metrics = {}
+            # Импорт замеряется в отдельном процессе, чтобы не мешать замерам страниц
+            for extra in (["--run-once"],
+                          ["--import-rows", str(size * args.sales_per_partner)]):
+                proc = subprocess.run(
+                    [sys.executable, __file__, *extra, "--repeats", str(args.repeats)],
+                    env=env, capture_output=True, text=True, cwd=BASE_DIR,
+                )
+                if proc.returncode != 0:
+                    print(proc.stderr, file=sys.stderr)
+                    return 2
+                metrics.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+            record = {
+                "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+                "revision": revision,
+                "partners": size,
+                "sales_per_partner": args.sales_per_partner,
+                "layout": args.layout,
+                **metrics,
+            }
+            with args.results.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            prev = previous.get((size, args.sales_per_partner, args.layout))
+            for metric in METRICS:
+                if record.get(metric) is None:
+                    continue
+                line = f"  {metric:32} {record[metric]:>10}"
+                if prev and prev.get(metric):
+                    change = (record[metric] - prev[metric]) / prev[metric] * 100
+                    line += f"   ({change:+.1f}% к {prev.get('revision') or prev['timestamp']})"
+                print(line)
+            for site in record.get("list_refresh_top_sites", []):
+                print(f"    рост при обновлении списка: {site['location']} "
+                      f"{site['size_diff'] / 1024:+.1f} КБ")
+            violations += check_budgets(record, budgets)
+
+    for v in violations:
+        print(f"Превышен бюджет: {v}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
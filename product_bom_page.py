@@ -0,0 +1,242 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QDoubleValidator
+from PySide6.QtWidgets import (
+    QLabel,
+    QVBoxLayout,
+    QHBoxLayout,
+    QWidget,
+    QPushButton,
+    QComboBox,
+    QSpinBox,
+    QLineEdit,
+    QGroupBox,
+    QFormLayout,
+    QMessageBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+)
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from DB_prepare import ENGINE, MaterialType, Product, ProductMaterial
+from db_writer import get_writer
+from material_calculator import calculate_product_materials
+from material_planning import delete_product_material, get_material_demand, set_product_material
+
+# Потребность по истории продаж на большой базе считается секунды — не в потоке интерфейса
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="material-demand")
+
+
+def _centered(text: str) -> QTableWidgetItem:
+    item = QTableWidgetItem(text)
+    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+    return item
+
+
+class ProductMaterialsWidget(QWidget):
+    """
+    Расчет материалов по спецификации продукции.
+
+    Параметры продукции берутся из сохраненной спецификации, а не
+    вводятся при каждом расчете; здесь же спецификация редактируется.
+    """
+
+    save_finished = Signal(object)  # Future задания записи
+    demand_loaded = Signal(object)  # Future расчета потребности
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.save_finished.connect(self._on_save_finished)
+        self.demand_loaded.connect(self._on_demand_loaded)
+        self._build_ui()
+        self._load_data()
+        self._refresh_bom()
+
+    @staticmethod
+    def _make_table(headers: list[str]) -> QTableWidget:
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in range(1, len(headers)):
+            table.horizontalHeader().setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        return table
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        params_group = QGroupBox("Продукция")
+        form_layout = QFormLayout(params_group)
+        form_layout.setSpacing(10)
+
+        # Поиск по вводу: продукции может быть много
+        self.product_combo = QComboBox()
+        self.product_combo.setEditable(True)
+        self.product_combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.product_combo.completer().setFilterMode(Qt.MatchFlag.MatchContains)
+        self.product_combo.currentIndexChanged.connect(self._refresh_bom)
+        form_layout.addRow("Продукция:", self.product_combo)
+
+        self.quantity_spin = QSpinBox()
+        self.quantity_spin.setRange(1, 1_000_000)
+        self.quantity_spin.setValue(1)
+        self.quantity_spin.valueChanged.connect(self._refresh_bom)
+        form_layout.addRow("Количество продукции:", self.quantity_spin)
+        layout.addWidget(params_group)
+
+        # Спецификация и расчет по ней
+        bom_group = QGroupBox("Материалы по спецификации")
+        bom_layout = QVBoxLayout(bom_group)
+        self.bom_table = self._make_table(
+            ["Тип материала", "Параметр 1", "Параметр 2", "Требуется, ед."]
+        )
+        self.bom_table.itemSelectionChanged.connect(self._on_bom_selected)
+        bom_layout.addWidget(self.bom_table)
+
+        edit_row = QHBoxLayout()
+        self.material_type_combo = QComboBox()
+        edit_row.addWidget(self.material_type_combo, 1)
+        self.param1_edit = QLineEdit("1.0")
+        self.param1_edit.setValidator(QDoubleValidator(0.01, 10000.0, 4))
+        self.param2_edit = QLineEdit("1.0")
+        self.param2_edit.setValidator(QDoubleValidator(0.01, 10000.0, 4))
+        for text, w in (("Параметр 1:", self.param1_edit), ("Параметр 2:", self.param2_edit)):
+            edit_row.addWidget(QLabel(text))
+            edit_row.addWidget(w)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.clicked.connect(self._on_save)
+        edit_row.addWidget(self.save_btn)
+        self.delete_btn = QPushButton("Удалить")
+        self.delete_btn.clicked.connect(self._on_delete)
+        edit_row.addWidget(self.delete_btn)
+        bom_layout.addLayout(edit_row)
+        layout.addWidget(bom_group)
+
+        # Потребность по всем продажам
+        demand_group = QGroupBox("Потребность в материалах по истории продаж")
+        demand_layout = QVBoxLayout(demand_group)
+        self.demand_btn = QPushButton("Рассчитать потребность")
+        self.demand_btn.clicked.connect(self._load_demand)
+        demand_layout.addWidget(self.demand_btn)
+        self.demand_table = self._make_table(["Тип материала", "Месяц", "Количество, ед."])
+        demand_layout.addWidget(self.demand_table)
+        layout.addWidget(demand_group)
+
+        info_label = QLabel("* Расход на единицу: параметр 1 × параметр 2 × коэффициент типа "
+                            "продукции; учитывается процент брака материала")
+        info_label.setStyleSheet("color: #666;")
+        layout.addWidget(info_label)
+
+    def _load_data(self):
+        """Загрузка продукции и типов материалов в комбобоксы"""
+        try:
+            with Session(ENGINE) as session:
+                for product_id, name in session.execute(
+                    select(Product.id, Product.name).order_by(Product.name)
+                ):
+                    self.product_combo.addItem(name, product_id)
+                for mt_id, name in session.execute(
+                    select(MaterialType.id, MaterialType.name).order_by(MaterialType.name)
+                ):
+                    self.material_type_combo.addItem(name, mt_id)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка загрузки данных", f"Не удалось загрузить данные: {str(e)}")
+
+    def _refresh_bom(self):
+        """Спецификация выбранной продукции и расчет материалов по ней"""
+        product_id = self.product_combo.currentData()
+        if product_id is None:
+            self.bom_table.setRowCount(0)
+            return
+        with Session(ENGINE) as session:
+            rows = session.execute(
+                select(ProductMaterial.material_type_id, MaterialType.name,
+                       ProductMaterial.param1, ProductMaterial.param2)
+                .join(MaterialType, MaterialType.id == ProductMaterial.material_type_id)
+                .where(ProductMaterial.product_id == product_id)
+                .order_by(MaterialType.name)
+            ).all()
+        amounts = calculate_product_materials(product_id, self.quantity_spin.value())
+        self.bom_table.setRowCount(len(rows))
+        for i, (mt_id, name, param1, param2) in enumerate(rows):
+            name_item = QTableWidgetItem(name)
+            name_item.setData(Qt.ItemDataRole.UserRole, (mt_id, float(param1), float(param2)))
+            self.bom_table.setItem(i, 0, name_item)
+            self.bom_table.setItem(i, 1, _centered(f"{float(param1):g}"))
+            self.bom_table.setItem(i, 2, _centered(f"{float(param2):g}"))
+            self.bom_table.setItem(i, 3, _centered(str(amounts.get(mt_id, ""))))
+
+    def _on_bom_selected(self):
+        """Выбранная строка спецификации переносится в поля редактирования"""
+        row = self.bom_table.currentRow()
+        item = self.bom_table.item(row, 0) if row >= 0 else None
+        if item is None:
+            return
+        mt_id, param1, param2 = item.data(Qt.ItemDataRole.UserRole)
+        self.material_type_combo.setCurrentIndex(self.material_type_combo.findData(mt_id))
+        self.param1_edit.setText(f"{param1:g}")
+        self.param2_edit.setText(f"{param2:g}")
+
+    def _submit(self, fn, *args):
+        # Запись выполняется потоком-писателем, результат приходит сигналом
+        self.save_btn.setEnabled(False)
+        self.delete_btn.setEnabled(False)
+        future = get_writer().submit(fn, *args)
+        future.add_done_callback(self.save_finished.emit)
+
+    def _on_save(self):
+        product_id = self.product_combo.currentData()
+        material_type_id = self.material_type_combo.currentData()
+        if product_id is None or material_type_id is None:
+            QMessageBox.warning(self, "Ошибка ввода", "Выберите продукцию и тип материала")
+            return
+        try:
+            param1 = float(self.param1_edit.text().replace(',', '.'))
+            param2 = float(self.param2_edit.text().replace(',', '.'))
+            if param1 <= 0 or param2 <= 0:
+                raise ValueError("Параметры продукции должны быть положительными числами")
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка ввода", str(e))
+            return
+        self._submit(set_product_material, product_id, material_type_id, param1, param2)
+
+    def _on_delete(self):
+        product_id = self.product_combo.currentData()
+        material_type_id = self.material_type_combo.currentData()
+        if product_id is None or material_type_id is None:
+            return
+        self._submit(delete_product_material, product_id, material_type_id)
+
+    def _on_save_finished(self, future):
+        self.save_btn.setEnabled(True)
+        self.delete_btn.setEnabled(True)
+        exc = future.exception()
+        if exc is not None:
+            QMessageBox.critical(self, "Ошибка сохранения", str(exc))
+            return
+        self._refresh_bom()
+
+    def _load_demand(self):
+        self.demand_btn.setEnabled(False)
+        future = _loader.submit(get_material_demand)
+        future.add_done_callback(self.demand_loaded.emit)
+
+    def _on_demand_loaded(self, future):
+        self.demand_btn.setEnabled(True)
+        exc = future.exception()
+        if exc is not None:
+            QMessageBox.critical(self, "Ошибка расчета", f"Не удалось рассчитать потребность: {str(exc)}")
+            return
+        rows = future.result()
+        self.demand_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            self.demand_table.setItem(i, 0, QTableWidgetItem(row.material_name))
+            self.demand_table.setItem(i, 1, _centered(row.month or "без даты"))
+            self.demand_table.setItem(i, 2, _centered(str(row.quantity)))
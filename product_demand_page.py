@@ -0,0 +1,201 @@
+from __future__ import annotations
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import (
+    QLabel,
+    QVBoxLayout,
+    QHBoxLayout,
+    QWidget,
+    QComboBox,
+    QSpinBox,
+    QGroupBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QMessageBox,
+)
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from DB_prepare import ENGINE, Partner, Product
+import demand_matrix
+from demand_matrix import DemandMatrix, get_demand_matrix
+
+# Построение матрицы на большой базе занимает секунды — не в потоке интерфейса
+_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="demand-matrix")
+
+
+class ProductDemandPage(QWidget):
+    # Результат фоновой загрузки: Future с (матрица, наименования партнеров, продукции)
+    data_loaded = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.matrix: DemandMatrix | None = None
+        self.partner_names: dict[int, str] = {}
+        self.product_names: dict[int, str] = {}
+        self.data_loaded.connect(self._on_data_loaded)
+        self._build_ui()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(24, 24, 24, 24)
+        layout.setSpacing(12)
+
+        title_lbl = QLabel("Спрос по продукции")
+        f = QFont()
+        f.setPointSize(12)
+        f.setBold(True)
+        title_lbl.setFont(f)
+        layout.addWidget(title_lbl)
+
+        limit_layout = QHBoxLayout()
+        limit_layout.addWidget(QLabel("Показать первых:"))
+        self.limit_spin = QSpinBox()
+        self.limit_spin.setRange(1, 1000)
+        self.limit_spin.setValue(10)
+        self.limit_spin.valueChanged.connect(self._update_tables)
+        limit_layout.addWidget(self.limit_spin)
+        limit_layout.addStretch()
+        layout.addLayout(limit_layout)
+
+        # Партнеры по продукции
+        product_group = QGroupBox("Партнеры, закупающие продукцию")
+        product_layout = QVBoxLayout(product_group)
+        self.product_combo = self._make_combo()
+        self.product_combo.currentIndexChanged.connect(self._update_product_table)
+        product_layout.addWidget(self.product_combo)
+        self.product_table = self._make_table("Партнер")
+        product_layout.addWidget(self.product_table)
+        layout.addWidget(product_group)
+
+        # Продукция партнера
+        partner_group = QGroupBox("Продукция, закупаемая партнером")
+        partner_layout = QVBoxLayout(partner_group)
+        self.partner_combo = self._make_combo()
+        self.partner_combo.currentIndexChanged.connect(self._update_partner_table)
+        partner_layout.addWidget(self.partner_combo)
+        self.partner_table = self._make_table("Продукция")
+        partner_layout.addWidget(self.partner_table)
+        layout.addWidget(partner_group)
+
+        self.status_label = QLabel("Загрузка данных…")
+        self.status_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.status_label)
+
+    @staticmethod
+    def _make_combo() -> QComboBox:
+        # Поиск по вводу: партнеров могут быть десятки тысяч
+        combo = QComboBox()
+        combo.setEditable(True)
+        combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        combo.completer().setFilterMode(Qt.MatchFlag.MatchContains)
+        combo.completer().setCompletionMode(combo.completer().CompletionMode.PopupCompletion)
+        return combo
+
+    @staticmethod
+    def _make_table(name_header: str) -> QTableWidget:
+        table = QTableWidget()
+        table.setColumnCount(3)
+        table.setHorizontalHeaderLabels([name_header, "Количество", "Доля, %"])
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Матрица дозагружает продажи, добавленные с прошлого показа
+        self.refresh()
+
+    def refresh(self):
+        """Фоновая загрузка матрицы и наименований"""
+        future = _loader.submit(self._load)
+        future.add_done_callback(self.data_loaded.emit)
+
+    @staticmethod
+    def _load():
+        matrix = get_demand_matrix()
+        with Session(ENGINE) as session:
+            partners = dict(session.execute(select(Partner.id, Partner.name)).all())
+            products = dict(session.execute(select(Product.id, Product.name)).all())
+        return matrix, partners, products
+
+    def _on_data_loaded(self, future):
+        exc = future.exception()
+        if exc is not None:
+            QMessageBox.critical(self, "Ошибка загрузки данных", f"Не удалось загрузить данные: {str(exc)}")
+            return
+        self.matrix, partners, products = future.result()
+        if partners != self.partner_names:
+            self.partner_names = partners
+            self._fill_combo(self.partner_combo, partners)
+        if products != self.product_names:
+            self.product_names = products
+            self._fill_combo(self.product_combo, products)
+        self._update_tables()
+
+    @staticmethod
+    def _fill_combo(combo: QComboBox, names: dict[int, str]):
+        current = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        for item_id, name in sorted(names.items(), key=lambda item: item[1]):
+            combo.addItem(name, item_id)
+        idx = combo.findData(current)
+        combo.setCurrentIndex(idx if idx >= 0 else 0)
+        combo.blockSignals(False)
+
+    def _update_tables(self):
+        self._update_product_table()
+        self._update_partner_table()
+
+    def _update_product_table(self):
+        product_id = self.product_combo.currentData()
+        if self.matrix is None or product_id is None:
+            return
+        t0 = time.perf_counter()
+        rows = self.matrix.top_partners(product_id, self.limit_spin.value())
+        total = self.matrix.product_total(product_id)
+        elapsed = time.perf_counter() - t0
+        self._fill_table(self.product_table, rows, total, self.partner_names)
+        self._show_status(elapsed)
+
+    def _update_partner_table(self):
+        partner_id = self.partner_combo.currentData()
+        if self.matrix is None or partner_id is None:
+            return
+        t0 = time.perf_counter()
+        rows = self.matrix.top_products(partner_id, self.limit_spin.value())
+        total = self.matrix.partner_total(partner_id)
+        elapsed = time.perf_counter() - t0
+        self._fill_table(self.partner_table, rows, total, self.product_names)
+        self._show_status(elapsed)
+
+    @staticmethod
+    def _fill_table(table: QTableWidget, rows: List[Tuple[int, int]], total: int,
+                    names: dict[int, str]):
+        table.setRowCount(len(rows))
+        for i, (item_id, quantity) in enumerate(rows):
+            table.setItem(i, 0, QTableWidgetItem(names.get(item_id, f"№ {item_id}")))
+            qty_item = QTableWidgetItem(str(quantity))
+            qty_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            table.setItem(i, 1, qty_item)
+            share = quantity / total * 100 if total else 0
+            share_item = QTableWidgetItem(f"{share:.1f}")
+            share_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            table.setItem(i, 2, share_item)
+
+    def _show_status(self, query_seconds: float):
+        m = self.matrix
+        nnz = f"{m.nnz:,}".replace(",", " ")
+        text = f"Матрица: {nnz} пар партнер–продукция, {m.nbytes / 2**20:.1f} МБ"
+        if demand_matrix.last_build_seconds is not None:
+            text += f", построена за {demand_matrix.last_build_seconds:.2f} с"
+        text += f"; запрос {query_seconds * 1e6:.0f} мкс"
+        self.status_label.setText(text)
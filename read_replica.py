@@ -0,0 +1,163 @@
+"""
+read_replica.py — копия app.db в памяти для чтения
+-------------------------------------------------
+
+Функции:
+* Копирование app.db в базу SQLite в памяти через backup API,
+  постранично и в фоновом потоке
+* Переключение соединений движка чтения на копию после ее готовности
+* Повтор на копии всех изменений, зафиксированных потоком записи
+* Для больших баз (выше порога) — чтение файла через mmap вместо копии
+
+Копия обслуживает один процесс: изменения, сделанные другими процессами
+(например, импортом DB_prepare.py), в нее не попадают до перезапуска.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+# Базы больше этого размера не копируются в память, а читаются через mmap
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Страниц за один шаг фонового копирования
+BACKUP_PAGES = 1024
+
+_SKIPPED_PREFIXES = ("BEGIN", "PRAGMA", "SELECT")
+
+
+class ReadReplica:
+    """
+    Копия базы в памяти (VFS memdb), доступная всем соединениям процесса.
+
+    Пока копия не готова, чтение идет из файла. В отличие от shared cache,
+    memdb блокирует базу так же, как файл: читатель не видит незавершенный
+    повтор записи и ждет его окончания (busy timeout), а не получает ошибку.
+    """
+
+    def __init__(self, db_path: Path, engine: Engine, writer, name: str = "app_replica"):
+        self.db_path = Path(db_path)
+        self.engine = engine
+        self.writer = writer
+        self.uri = f"file:/{name}?vfs=memdb"
+        self.ready = False
+        self._pending: list = []
+        # Соединение-хранитель: база в памяти живет, пока оно открыто
+        self._keeper = sqlite3.connect(self.uri, uri=True, check_same_thread=False,
+                                       isolation_level=None)
+
+        event.listen(engine, "do_connect", self._on_do_connect)
+        # После выполнения: запрос, завершившийся ошибкой внутри SAVEPOINT
+        # задания, не записывается; SAVEPOINT и ROLLBACK TO повторяются вместе
+        # с остальными запросами
+        event.listen(writer.engine, "after_cursor_execute", self._capture)
+        event.listen(writer.engine, "rollback", self._discard)
+        writer.add_commit_hook(self._replay)
+
+    # Соединения чтения
+    def _on_do_connect(self, _dialect, _conn_rec, cargs, cparams):
+        if self.ready:
+            cargs[:] = [self.uri]
+            cparams["uri"] = True
+            cparams["check_same_thread"] = False
+
+    # Копирование
+    def start(self):
+        """Запуск фонового копирования"""
+        threading.Thread(target=self._copy, name="db-replica", daemon=True).start()
+
+    def _copy(self):
+        try:
+            src = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                # Первый проход — в фоне, не мешая записи
+                src.backup(self._keeper, pages=BACKUP_PAGES, sleep=0.001)
+            finally:
+                src.close()
+            # Второй проход — внутри транзакции записи, чтобы между копией
+            # и повтором изменений не было пропущенных транзакций
+            self.writer.submit(self._finalize).result()
+        except Exception:
+            log.exception("Не удалось создать копию базы в памяти")
+            return
+        # Пересоздаем пул: новые соединения открываются на копии
+        self.engine.dispose()
+        log.info("Чтение переключено на копию базы в памяти")
+
+    def _finalize(self, session):
+        # Транзакция потока записи держит блокировку записи (BEGIN IMMEDIATE);
+        # изменения этой же группы заданий попадут в копию через _replay
+        session.connection()
+        src = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            src.backup(self._keeper)
+        finally:
+            src.close()
+        self.ready = True
+
+    # Повтор записи
+    def _capture(self, _conn, _cursor, statement, parameters, _context, executemany):
+        if not statement.lstrip().upper().startswith(_SKIPPED_PREFIXES):
+            self._pending.append((statement, parameters, executemany))
+
+    def _discard(self, _conn):
+        self._pending.clear()
+
+    def _replay(self):
+        pending, self._pending = self._pending, []
+        if not self.ready or not pending:
+            return
+        try:
+            self._keeper.execute("BEGIN")
+            for statement, parameters, executemany in pending:
+                if executemany:
+                    self._keeper.executemany(statement, parameters)
+                else:
+                    self._keeper.execute(statement, parameters)
+            self._keeper.execute("COMMIT")
+        except sqlite3.Error:
+            log.exception("Копия базы расходится с файлом, чтение возвращено на файл")
+            if self._keeper.in_transaction:
+                self._keeper.execute("ROLLBACK")
+            self.ready = False
+            self.engine.dispose()
+
+
+def enable_mmap(engine: Engine, size: int):
+    """Чтение файла базы через отображение в память для всех соединений движка"""
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.execute(f"PRAGMA mmap_size = {int(size)}")
+
+    engine.dispose()
+
+
+def enable_read_replica(db_path: Path, engine: Engine, writer,
+                        max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[ReadReplica]:
+    """
+    Включение чтения из копии базы в памяти.
+
+    Аргументы:
+        db_path: Путь к app.db
+        engine: Движок чтения
+        writer: Поток записи (DBWriter)
+        max_bytes: Порог размера базы; для баз больше порога включается mmap
+
+    Возвращает:
+        ReadReplica или None, если выбран режим mmap
+    """
+    size = Path(db_path).stat().st_size
+    if size > max_bytes:
+        # Запас на рост базы за время работы приложения
+        enable_mmap(engine, size * 2)
+        return None
+    replica = ReadReplica(db_path, engine, writer)
+    replica.start()
+    return replica
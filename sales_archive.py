@@ -0,0 +1,311 @@
+"""
+sales_archive.py — архив продаж по годам
+---------------------------------------
+
+Функции:
+* Перенос продаж закрытых лет из partner_products в отдельные файлы
+  archive/partner_products_<год>.db
+* Подключение архивов к соединениям чтения (ATTACH DATABASE, только чтение,
+  immutable) и временное представление partner_products, объединяющее
+  текущую таблицу и архивы: страницы, выгрузки и скидки читают все продажи
+  без изменений в коде
+* Наибольший id в архивах: номера новых продаж продолжают его, а не
+  начинаются заново после переноса всех строк из текущей таблицы
+* Блокировка, по которой архивирование узнает о запущенном приложении
+
+Соединения потока записи архивы не подключают и работают с текущей таблицей.
+Приложение подключает архивы только при открытии соединений и читает их как
+неизменяемые, поэтому архивирование выполняется при закрытом приложении:
+пока оно запущено (держит блокировку app.db.lock), main() отказывается работать.
+SQLite по умолчанию допускает не более 10 подключенных баз, поэтому
+архивов должно быть не больше 10 (при необходимости объединяйте старые годы).
+Даты в архивах хранятся в том же виде, что и в текущей таблице (см.
+sales_layout), поэтому границы лет переводятся по схеме базы.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+import sqlite3
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from sales_layout import ROWID, connection_layout, date_param
+
+ARCHIVE_FILE_RE = re.compile(r"^partner_products_(\d{4})\.db$")
+SALES_COLUMNS = ("id", "partner_id", "product_id", "quantity", "sale_date")
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partner_products (
+    id INTEGER PRIMARY KEY,
+    partner_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER,
+    sale_date DATE
+);
+CREATE INDEX IF NOT EXISTS ix_pp_partner_date ON partner_products (partner_id, sale_date);
+CREATE INDEX IF NOT EXISTS ix_pp_sale_date ON partner_products (sale_date);
+"""
+
+
+def archive_path(archive_dir: Path, year: int) -> Path:
+    return archive_dir / f"partner_products_{year}.db"
+
+
+def archived_years(archive_dir: Path) -> List[int]:
+    """Годы, для которых существуют файлы архива, по возрастанию"""
+    if not archive_dir.is_dir():
+        return []
+    years = []
+    for path in archive_dir.iterdir():
+        m = ARCHIVE_FILE_RE.match(path.name)
+        if m:
+            years.append(int(m.group(1)))
+    return sorted(years)
+
+
+def _year_bounds(year: int, sales_layout: str = ROWID):
+    return (date_param(dt.date(year, 1, 1), sales_layout),
+            date_param(dt.date(year + 1, 1, 1), sales_layout))
+
+
+def _sql_literal(value) -> str:
+    return f"'{value}'" if isinstance(value, str) else str(value)
+
+
+def _union_view_sql(years: List[int], sales_layout: str = ROWID) -> str:
+    cols = ", ".join(SALES_COLUMNS)
+    parts = [f"SELECT {cols} FROM main.partner_products"]
+    for year in years:
+        start, end = map(_sql_literal, _year_bounds(year, sales_layout))
+        # Диапазон в каждой ветви позволяет отсечь раздел по индексу sale_date
+        parts.append(
+            f"SELECT {cols} FROM arch_{year}.partner_products "
+            f"WHERE sale_date >= {start} AND sale_date < {end}"
+        )
+    return "CREATE TEMP VIEW IF NOT EXISTS partner_products AS\n" + "\nUNION ALL\n".join(parts)
+
+
+def attach_archives(dbapi_conn, archive_dir: Path):
+    """Подключение архивов к соединению sqlite3 и создание объединяющего представления"""
+    years = archived_years(archive_dir)
+    if not years:
+        return
+    cursor = dbapi_conn.cursor()
+    for year in years:
+        uri = archive_path(archive_dir, year).resolve().as_uri()
+        cursor.execute(f"ATTACH DATABASE '{uri}?mode=ro&immutable=1' AS arch_{year}")
+    cursor.execute(_union_view_sql(years, connection_layout(dbapi_conn)))
+    cursor.close()
+
+
+def install_archive_views(engine: Engine, archive_dir: Path):
+    """
+    Подключение архивов ко всем новым соединениям движка чтения.
+
+    Движок должен быть создан с connect_args={"uri": True}, чтобы
+    работали флаги mode=ro и immutable.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        attach_archives(dbapi_conn, archive_dir)
+
+
+_max_id_cache: Tuple[tuple, int] = ((), 0)
+
+
+def archived_max_id(archive_dir: Path) -> int:
+    """
+    Наибольший id продажи во всех архивах (0, если архивов нет).
+
+    Результат кэшируется до изменения набора или времени изменения
+    файлов архива.
+    """
+    global _max_id_cache
+    paths = [archive_path(archive_dir, year) for year in archived_years(archive_dir)]
+    key = tuple((p.name, p.stat().st_mtime_ns) for p in paths)
+    cached_key, value = _max_id_cache
+    if key == cached_key:
+        return value
+    value = 0
+    for path in paths:
+        con = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            value = max(value, con.execute("SELECT MAX(id) FROM partner_products").fetchone()[0] or 0)
+        finally:
+            con.close()
+    _max_id_cache = (key, value)
+    return value
+
+
+def _lock_path(db_path: Path) -> Path:
+    return Path(db_path).with_name(Path(db_path).name + ".lock")
+
+
+def hold_app_lock(db_path: Path) -> sqlite3.Connection:
+    """
+    Разделяемая блокировка на время работы приложения.
+
+    Открытая транзакция чтения служебного файла SQLite держит блокировку
+    SHARED; несколько экземпляров приложения держат ее одновременно,
+    а после завершения процесса (в том числе аварийного) она снимается.
+
+    Возвращает:
+        Соединение, которое должно оставаться открытым до выхода
+    """
+    con = sqlite3.connect(_lock_path(db_path), isolation_level=None, check_same_thread=False)
+    con.execute("BEGIN")
+    con.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    return con
+
+
+@contextmanager
+def exclusive_app_lock(db_path: Path):
+    """
+    Исключительная блокировка на время архивирования или перевода схемы
+    продаж (sales_layout.migrate). Если приложение запущено и держит
+    hold_app_lock, выбрасывается RuntimeError.
+    """
+    con = sqlite3.connect(_lock_path(db_path), timeout=0, isolation_level=None)
+    try:
+        try:
+            con.execute("BEGIN EXCLUSIVE")
+        except sqlite3.OperationalError:
+            raise RuntimeError(
+                "Приложение работает с базой; закройте его и повторите"
+            ) from None
+        yield
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def archive_year(year: int, archive_dir: Path, db_path: Path, writer, engine: Engine) -> int:
+    """
+    Перенос продаж за год в файл архива.
+
+    Строки копируются в новый файл архива, затем удаляются из текущей
+    таблицы через поток записи. Повторный вызов для уже архивированного
+    года дописывает поступившие позже продажи этого года. Файл архива
+    заменяется целиком, поэтому приложение должно быть закрыто (см.
+    exclusive_app_lock).
+
+    Аргументы:
+        year: Закрываемый год
+        archive_dir: Каталог архива
+        db_path: Путь к app.db
+        writer: Поток записи (DBWriter)
+        engine: Движок чтения; его соединения пересоздаются,
+                чтобы подключить новый архив
+
+    Возвращает:
+        Количество перенесенных строк
+    """
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_path(archive_dir, year)
+    tmp_path = path.with_suffix(".tmp")
+    cols = ", ".join(SALES_COLUMNS)
+
+    if tmp_path.exists():
+        tmp_path.unlink()
+    con = sqlite3.connect(tmp_path, uri=True)
+    try:
+        con.executescript(ARCHIVE_SCHEMA)
+        if path.exists():
+            con.execute("ATTACH DATABASE ? AS old", (f"{path.resolve().as_uri()}?mode=ro",))
+            con.execute(f"INSERT INTO partner_products ({cols}) SELECT {cols} FROM old.partner_products")
+            con.commit()
+            con.execute("DETACH DATABASE old")
+        con.execute("ATTACH DATABASE ? AS src", (f"{Path(db_path).resolve().as_uri()}?mode=ro",))
+        start, end = _year_bounds(year, connection_layout(con, "src"))
+        # Граница по id фиксирует набор строк: продажи, добавленные во время
+        # копирования, останутся в текущей таблице до следующего вызова
+        max_id = con.execute(
+            "SELECT MAX(id) FROM src.partner_products WHERE sale_date >= ? AND sale_date < ?",
+            (start, end),
+        ).fetchone()[0]
+        cur = con.execute(
+            f"INSERT OR IGNORE INTO partner_products ({cols}) "
+            f"SELECT {cols} FROM src.partner_products "
+            f"WHERE sale_date >= ? AND sale_date < ? AND id <= ?",
+            (start, end, max_id or 0),
+        )
+        moved = cur.rowcount
+        con.commit()
+        con.execute("DETACH DATABASE src")
+    finally:
+        con.close()
+    os.replace(tmp_path, path)
+
+    if max_id is not None:
+        def _delete(session):
+            session.connection().exec_driver_sql(
+                "DELETE FROM partner_products WHERE sale_date >= ? AND sale_date < ? AND id <= ?",
+                (start, end, max_id),
+            )
+
+        writer.submit(_delete).result()
+    engine.dispose()
+    return moved
+
+
+def archive_closed_years(archive_dir: Path, db_path: Path, writer, engine: Engine,
+                         before_year: Optional[int] = None) -> dict[int, int]:
+    """
+    Архивирование всех лет раньше before_year (по умолчанию — текущего года).
+
+    Возвращает:
+        Словарь {год: количество перенесенных строк}
+    """
+    if before_year is None:
+        before_year = dt.date.today().year
+    con = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        years = [
+            int(y) for (y,) in con.execute(
+                "SELECT DISTINCT strftime('%Y', sale_date) FROM partner_products "
+                "WHERE sale_date < ? AND sale_date IS NOT NULL",
+                (date_param(dt.date(before_year, 1, 1), connection_layout(con)),),
+            )
+        ]
+    finally:
+        con.close()
+    return {
+        year: archive_year(year, archive_dir, db_path, writer, engine)
+        for year in sorted(years)
+    }
+
+
+def main():
+    import argparse
+
+    from DB_prepare import ARCHIVE_DIR, DB_PATH, ENGINE
+    from db_writer import get_writer
+
+    parser = argparse.ArgumentParser(
+        description="Архивирование продаж закрытых лет. Приложение должно быть "
+                    "закрыто: оно читает файлы архива как неизменяемые. Пока "
+                    "приложение запущено, архивирование не выполняется",
+    )
+    parser.add_argument("--before-year", type=int, default=None,
+                        help="архивировать годы раньше указанного (по умолчанию — текущего)")
+    args = parser.parse_args()
+    try:
+        with exclusive_app_lock(DB_PATH):
+            moved = archive_closed_years(ARCHIVE_DIR, DB_PATH, get_writer(), ENGINE,
+                                         args.before_year)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    for year, count in moved.items():
+        print(f"{year}: перенесено строк {count}")
+    if not moved:
+        print("Нет продаж для архивирования")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+sales_layout.py — компактная схема хранения продаж
+-------------------------------------------------
+
+Функции:
+* Необязательная схема partner_products: таблица WITHOUT ROWID
+  с первичным ключом (partner_id, sale_date, id) — продажи партнера
+  лежат подряд на соседних страницах, история и суммы по партнеру
+  читают их одним диапазоном без обращений к отдельной таблице
+* Даты продаж в этой схеме — целые номера юлианского дня (SaleDate,
+  TypeDecorator): ORM по-прежнему работает с datetime.date, а функции
+  дат SQLite (date, strftime) принимают такие числа без изменений
+* Определение схемы базы и значения дат для запросов на чистом SQL
+  (date_param)
+* Перевод базы между схемами (migrate) и замер размера файла, числа
+  чтений страниц и времени типовых запросов до и после (benchmark)
+
+Схема выбирается при создании базы (DB_prepare.py --layout clustered)
+или переводом существующей: python sales_layout.py --migrate clustered.
+Схема определяется один раз при запуске процесса по файлу базы (см.
+DB_prepare), поэтому на время перевода приложение должно быть закрыто.
+В компактной схеме дата продажи обязательна.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from sqlalchemy import Date, Integer, event, func, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+ROWID = "rowid"
+CLUSTERED = "clustered"
+LAYOUTS = (ROWID, CLUSTERED)
+
+# date.toordinal() + JULIAN_OFFSET — номер юлианского дня (полдень даты),
+# который SQLite понимает как момент времени: date(2460311) = '2024-01-01'
+JULIAN_OFFSET = 1_721_425
+
+# Схема текущего процесса; задается по файлу базы при импорте DB_prepare
+layout = ROWID
+
+_ROWID_SCHEMA = """
+CREATE TABLE {table} (
+    id INTEGER NOT NULL,
+    partner_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER,
+    sale_date DATE,
+    PRIMARY KEY (id),
+    FOREIGN KEY(partner_id) REFERENCES partners (id),
+    FOREIGN KEY(product_id) REFERENCES products (id)
+)
+"""
+_ROWID_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_partner_products_partner_date_qty "
+    "ON partner_products (partner_id, sale_date, quantity)",
+)
+
+_CLUSTERED_SCHEMA = """
+CREATE TABLE {table} (
+    id INTEGER NOT NULL,
+    partner_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER,
+    sale_date INTEGER NOT NULL,
+    PRIMARY KEY (partner_id, sale_date, id),
+    FOREIGN KEY(partner_id) REFERENCES partners (id),
+    FOREIGN KEY(product_id) REFERENCES products (id)
+) WITHOUT ROWID
+"""
+# Поиск по id (ORM, дозагрузка матрицы спроса, архив) и max(id) для новых
+# номеров. Вставке без id (чистый SQL) номер назначает триггер
+_CLUSTERED_INDEXES = (
+    "CREATE UNIQUE INDEX ix_partner_products_id ON partner_products (id)",
+    """CREATE TRIGGER partner_products_assign_id BEFORE INSERT ON partner_products
+WHEN NEW.id IS NULL
+BEGIN
+    INSERT INTO partner_products (id, partner_id, product_id, quantity, sale_date)
+    VALUES ((SELECT coalesce(max(id), 0) + 1 FROM partner_products),
+            NEW.partner_id, NEW.product_id, NEW.quantity, NEW.sale_date);
+    SELECT RAISE(IGNORE);
+END""",
+)
+
+# Перевод значений дат средствами SQLite; оба выражения не меняют
+# значения, уже записанные в нужном виде
+_TO_DAY_SQL = "CAST(julianday(sale_date) + 0.5 AS INTEGER)"
+_TO_TEXT_SQL = "date(sale_date)"
+
+_COLUMNS = "id, partner_id, product_id, quantity, sale_date"
+
+
+def to_day_number(value: Union[dt.date, str]) -> int:
+    if isinstance(value, str):
+        value = dt.date.fromisoformat(value)
+    return value.toordinal() + JULIAN_OFFSET
+
+
+def from_day_number(value: int) -> dt.date:
+    return dt.date.fromordinal(value - JULIAN_OFFSET)
+
+
+def date_param(value: Union[dt.date, str], sales_layout: str) -> Union[str, int]:
+    """
+    Значение даты для сравнения с sale_date в запросе на чистом SQL.
+
+    Аргументы:
+        value: Дата или строка ISO
+        sales_layout: Схема базы (connection_layout)
+
+    Возвращает:
+        Строку ISO для ROWID, номер дня для CLUSTERED
+    """
+    if sales_layout == CLUSTERED:
+        return to_day_number(value)
+    return value if isinstance(value, str) else value.isoformat()
+
+
+class SaleDate(TypeDecorator):
+    """Дата продажи: DATE в обычной схеме, номер юлианского дня в компактной"""
+
+    impl = Date
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if layout == CLUSTERED:
+            return dialect.type_descriptor(Integer())
+        return dialect.type_descriptor(Date())
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and layout == CLUSTERED:
+            return to_day_number(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, int):
+            return from_day_number(value)
+        return value
+
+
+def set_layout(value: str):
+    """Схема для SaleDate в текущем процессе (до первого запроса)"""
+    global layout
+    if value not in LAYOUTS:
+        raise ValueError(f"Неизвестная схема: {value}")
+    layout = value
+
+
+def connection_layout(conn: sqlite3.Connection, schema: str = "main") -> str:
+    """Схема partner_products в базе, подключенной к соединению sqlite3 под именем schema"""
+    row = conn.execute(
+        f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'partner_products'"
+    ).fetchone()
+    if row and "WITHOUT ROWID" in row[0].upper():
+        return CLUSTERED
+    return ROWID
+
+
+def database_layout(db_path: Path) -> str:
+    """Схема partner_products в файле базы (ROWID, если файла еще нет)"""
+    if not Path(db_path).exists():
+        return ROWID
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return connection_layout(conn)
+    finally:
+        conn.close()
+
+
+def assign_ids_on_flush(model, archive_dir: Optional[Path] = None):
+    """
+    Назначение id новым продажам перед записью.
+
+    В таблице WITHOUT ROWID база не выдает id сама, а ORM ждет его
+    в ответ на вставку, поэтому номера max(id) + 1, ... назначаются
+    заранее. Запись идет через один поток (db_writer), поэтому двум
+    сессиям один номер не достанется.
+
+    В обеих схемах номера продолжают и наибольший id архивов: после
+    переноса всех строк в архив SQLite начал бы их заново, и в
+    объединяющем представлении появились бы повторяющиеся id.
+
+    Аргументы:
+        model: ORM класс продаж
+        archive_dir: Каталог архива продаж (None — архивы не учитываются)
+    """
+    # Импорт здесь: sales_archive сам использует этот модуль
+    from sales_archive import archived_max_id
+
+    @event.listens_for(Session, "before_flush")
+    def _assign(session, _flush_context, _instances):
+        if archive_dir is None and layout != CLUSTERED:
+            return
+        new = [obj for obj in session.new if isinstance(obj, model) and obj.id is None]
+        if not new:
+            return
+        # Через соединение, а не сессию: запрос сессии вызвал бы autoflush
+        last = session.connection().execute(select(func.max(model.id))).scalar() or 0
+        if archive_dir is not None:
+            last = max(last, archived_max_id(archive_dir))
+        new.sort(key=lambda obj: inspect(obj).insert_order)
+        for next_id, obj in enumerate(new, start=last + 1):
+            obj.id = next_id
+
+
+def ensure_indexes(db_path: Path) -> bool:
+    """
+    Создание индексов продаж в обычной схеме базы, созданной до их появления.
+
+    Повторный вызов ничего не меняет; компактную схему индексы не
+    касаются — ее первичный ключ уже упорядочен по партнеру и дате.
+
+    Аргументы:
+        db_path: Путь к файлу базы
+
+    Возвращает:
+        True, если индексы были созданы
+    """
+    if not Path(db_path).exists():
+        return False
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partner_products'"
+        ).fetchone()
+        if table is None or connection_layout(conn) != ROWID:
+            return False
+        indexes = (
+            "SELECT count(*) FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = 'partner_products'"
+        )
+        before = conn.execute(indexes).fetchone()[0]
+        for statement in _ROWID_INDEXES:
+            conn.execute(statement)
+        created = conn.execute(indexes).fetchone()[0] != before
+    finally:
+        conn.close()
+    return created
+
+
+def _migrate_archives(archive_dir: Path, target: str):
+    # Импорт здесь: sales_archive сам использует этот модуль
+    from sales_archive import archive_path, archived_years
+
+    expr = _TO_DAY_SQL if target == CLUSTERED else _TO_TEXT_SQL
+    for year in archived_years(archive_dir):
+        conn = sqlite3.connect(archive_path(archive_dir, year), isolation_level=None)
+        try:
+            conn.execute(f"UPDATE partner_products SET sale_date = {expr} "
+                         f"WHERE sale_date IS NOT NULL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+
+def migrate(db_path: Path, target: str, archive_dir: Optional[Path] = None) -> bool:
+    """
+    Перевод partner_products в схему target.
+
+    Таблица пересоздается одной транзакцией: строки копируются в порядке
+    (partner_id, sale_date, id) с переводом дат, затем база сжимается
+    (VACUUM). Даты в файлах архива переводятся так же, чтобы объединяющее
+    представление сравнивало значения одного вида. Приложение и другие
+    процессы на время перевода должны быть закрыты.
+
+    Аргументы:
+        db_path: Путь к файлу базы
+        target: ROWID или CLUSTERED
+        archive_dir: Каталог архива продаж (None — архивы не переводятся)
+
+    Возвращает:
+        False, если база уже в схеме target
+    """
+    if target not in LAYOUTS:
+        raise ValueError(f"Неизвестная схема: {target}")
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if connection_layout(conn) == target:
+            return False
+        if target == CLUSTERED:
+            (missing,) = conn.execute(
+                "SELECT count(*) FROM partner_products WHERE sale_date IS NULL"
+            ).fetchone()
+            if missing:
+                raise RuntimeError(
+                    f"Продаж без даты: {missing}; в компактной схеме дата продажи "
+                    f"входит в первичный ключ и обязательна"
+                )
+            schema, indexes, expr = _CLUSTERED_SCHEMA, _CLUSTERED_INDEXES, _TO_DAY_SQL
+        else:
+            schema, indexes, expr = _ROWID_SCHEMA, _ROWID_INDEXES, _TO_TEXT_SQL
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(schema.format(table="partner_products_new"))
+            # Вставка по порядку ключа заполняет страницы B-дерева подряд
+            conn.execute(
+                f"INSERT INTO partner_products_new ({_COLUMNS}) "
+                f"SELECT id, partner_id, product_id, quantity, {expr} "
+                f"FROM partner_products ORDER BY partner_id, sale_date, id"
+            )
+            conn.execute("DROP TABLE partner_products")
+            conn.execute("ALTER TABLE partner_products_new RENAME TO partner_products")
+            for statement in indexes:
+                conn.execute(statement)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    if archive_dir is not None:
+        _migrate_archives(archive_dir, target)
+    return True
+
+
+# Замеры
+def _read_calls() -> Optional[int]:
+    """Число системных вызовов чтения процесса (None, если недоступно)"""
+    try:
+        import psutil
+    except ImportError:
+        pass
+    else:
+        try:
+            return psutil.Process().io_counters().read_count
+        except (AttributeError, NotImplementedError):
+            return None
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("syscr:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _measure_query(db_path: Path, sql: str, params: tuple):
+    """
+    Чтения страниц и время одного запроса на новом соединении.
+
+    У нового соединения пустой кэш страниц, а без mmap каждая страница
+    читается отдельным вызовом read, поэтому прирост числа вызовов за
+    запрос — число прочитанных страниц. Схема и заголовок базы читаются
+    заранее, в той же транзакции.
+    """
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True,
+                           isolation_level=None)
+    try:
+        conn.execute("PRAGMA mmap_size = 0")
+        conn.execute("BEGIN")
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        reads = _read_calls()
+        t0 = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - t0
+        after = _read_calls()
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return (None if reads is None or after is None else after - reads), elapsed
+
+
+def _measure(db_path: Path, partner_ids: list, year: int) -> Dict[str, dict]:
+    conn = sqlite3.connect(db_path)
+    try:
+        sales_layout = connection_layout(conn)
+    finally:
+        conn.close()
+    year_bounds = (date_param(dt.date(year, 1, 1), sales_layout),
+                   date_param(dt.date(year + 1, 1, 1), sales_layout))
+    queries = {
+        # Те же запросы, что у страниц приложения и выписок
+        "история партнера": (
+            "SELECT pr.name, pp.quantity, pp.sale_date FROM partner_products pp "
+            "JOIN products pr ON pr.id = pp.product_id "
+            "WHERE pp.partner_id = ? ORDER BY pp.sale_date DESC",
+            lambda pid: (pid,),
+        ),
+        "сумма по партнеру": (
+            "SELECT sum(quantity) FROM partner_products WHERE partner_id = ?",
+            lambda pid: (pid,),
+        ),
+        "продажи партнера за год": (
+            "SELECT sale_date, product_id, quantity FROM partner_products "
+            "WHERE partner_id = ? AND sale_date >= ? AND sale_date < ? ORDER BY sale_date",
+            lambda pid: (pid, *year_bounds),
+        ),
+    }
+    results = {}
+    for name, (sql, params) in queries.items():
+        reads, seconds = [], []
+        for pid in partner_ids:
+            r, s = _measure_query(db_path, sql, params(pid))
+            reads.append(r)
+            seconds.append(s)
+        results[name] = {
+            "page_reads": None if None in reads else sum(reads) / len(reads),
+            "ms": sum(seconds) / len(seconds) * 1000,
+        }
+    r, s = _measure_query(db_path, "SELECT partner_id, product_id, quantity FROM partner_products", ())
+    results["все продажи (матрица спроса)"] = {"page_reads": r, "ms": s * 1000}
+    return results
+
+
+def benchmark(db_path: Path, partners: int = 50, seed: int = 1) -> dict:
+    """
+    Сравнение схем на копии базы: размер файла, чтения страниц и время
+    типовых запросов по партнерам.
+
+    Копия базы сжимается в обычной схеме (замер «до»), затем переводится
+    в компактную (замер «после»); сама база не меняется. Архивы не
+    учитываются.
+
+    Аргументы:
+        db_path: Путь к базе
+        partners: Число случайных партнеров для запросов по партнеру
+        seed: Зерно выбора партнеров
+
+    Возвращает:
+        Словарь {"size": {схема: байт}, "queries": {схема: {запрос: замер}}}
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = Path(tmp) / "bench.db"
+        src = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        dst = sqlite3.connect(copy)
+        try:
+            src.backup(dst)
+            (year,) = dst.execute(
+                "SELECT CAST(strftime('%Y', max(sale_date)) AS INTEGER) FROM partner_products"
+            ).fetchone()
+            ids = [pid for (pid,) in dst.execute("SELECT id FROM partners ORDER BY id")]
+            # Без журнала WAL файл базы — единственный источник чтений
+            dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            src.close()
+            dst.close()
+        partner_ids = random.Random(seed).sample(ids, min(partners, len(ids)))
+
+        size, queries = {}, {}
+        for target in (ROWID, CLUSTERED):
+            if not migrate(copy, target):
+                conn = sqlite3.connect(copy, isolation_level=None)
+                conn.execute("VACUUM")
+                conn.close()
+            size[target] = os.path.getsize(copy)
+            queries[target] = _measure(copy, partner_ids, year or dt.date.today().year)
+    return {"size": size, "queries": queries}
+
+
+def _print_benchmark(result: dict):
+    size = result["size"]
+    print(f"Размер базы: {size[ROWID] / 2**20:.1f} МБ -> {size[CLUSTERED] / 2**20:.1f} МБ "
+          f"({(size[CLUSTERED] - size[ROWID]) / size[ROWID] * 100:+.0f}%)")
+    print(f"{'Запрос':<30} {'чтений страниц':>22} {'время, мс':>22}")
+    before, after = result["queries"][ROWID], result["queries"][CLUSTERED]
+
+    def pair(a, b, fmt):
+        return "—" if a is None or b is None else f"{a:{fmt}} -> {b:{fmt}}"
+
+    for name in before:
+        reads = pair(before[name]["page_reads"], after[name]["page_reads"], ".1f")
+        ms = pair(before[name]["ms"], after[name]["ms"], ".2f")
+        print(f"{name:<30} {reads:>22} {ms:>22}")
+
+
+def main(argv=None):
+    import argparse
+
+    from DB_prepare import ARCHIVE_DIR, DB_PATH
+    from sales_archive import exclusive_app_lock
+
+    parser = argparse.ArgumentParser(description="Схема хранения продаж: перевод и замеры")
+    parser.add_argument("--migrate", choices=LAYOUTS, default=None,
+                        help="перевести базу в схему (приложение должно быть закрыто)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="сравнить схемы на копии базы")
+    parser.add_argument("--partners", type=int, default=50,
+                        help="число партнеров для замеров запросов")
+    args = parser.parse_args(argv)
+    if not args.migrate and not args.benchmark:
+        print(f"Схема продаж: {database_layout(DB_PATH)}")
+    if args.benchmark:
+        _print_benchmark(benchmark(DB_PATH, args.partners))
+    if args.migrate:
+        t0 = time.perf_counter()
+        try:
+            with exclusive_app_lock(DB_PATH):
+                migrated = migrate(DB_PATH, args.migrate, ARCHIVE_DIR)
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+        if migrated:
+            print(f"База переведена в схему {args.migrate} за {time.perf_counter() - t0:.1f} с")
+        else:
+            print(f"База уже в схеме {args.migrate}")
+
+
+if __name__ == "__main__":
+    main()